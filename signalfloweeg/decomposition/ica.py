@@ -1,15 +1,97 @@
 # -*- coding: utf-8 -*-
 """
 Module: ica
-Description: [Insert module description here]
+Description: ICA component removal expressed as a single linear operator
 """
 
 # Imports
 import numpy as np
 import mne
 
-# Functions and classes
-def dummy_function():
-    pass
+
+def ica_operator(ica, exclude=None, include=None, n_pca_components=None):
+    """
+    Collapse the removal of ICA components into one affine map.
+
+    mne.preprocessing.ICA.apply pre-whitens, centres, unmixes, zeroes the
+    excluded sources, mixes back and undoes the whitening. All of these are
+    linear, so the whole step equals ``M @ x + offset`` on the ICA channels,
+    which costs a single matrix multiply per chunk.
+
+    Parameters:
+    -----------
+    ica : mne.preprocessing.ICA
+        A fitted ICA.
+    exclude : list of int, optional
+        Components to remove. Defaults to ica.exclude.
+    include : list of int, optional
+        Components to keep; overrides exclude, as in ICA.apply.
+    n_pca_components : int, optional
+        PCA components used for reconstruction. Defaults to ica.n_pca_components.
+
+    Returns:
+    --------
+    ch_names : list of str
+        The channels the operator applies to, in order.
+    M : numpy.ndarray
+        Channels x channels matrix.
+    offset : numpy.ndarray
+        Per-channel offset, shape (channels, 1).
+    """
+    if exclude is None:
+        exclude = ica.exclude
+    if n_pca_components is None:
+        n_pca_components = ica.n_pca_components
+    n_pca = ica._check_n_pca_components(n_pca_components)
+    n_components = ica.n_components_
+
+    keep = np.arange(n_components)
+    if include not in (None, []):
+        keep = np.unique(include)
+    elif exclude not in (None, []):
+        keep = np.setdiff1d(keep, exclude)
+    keep = np.concatenate([keep, np.arange(n_components, n_pca)]).astype(int)
+
+    # Unmixing and mixing in the space of the first n_pca PCA components
+    pca_components = ica.pca_components_[:n_pca]
+    unmixing = np.eye(n_pca)
+    unmixing[:n_components, :n_components] = ica.unmixing_matrix_
+    mixing = np.eye(n_pca)
+    mixing[:n_components, :n_components] = ica.mixing_matrix_
+    P = (pca_components.T @ mixing[:, keep]) @ (unmixing[keep] @ pca_components)
+
+    n_channels = len(ica.ch_names)
+    mean = ica.pca_mean_[:, None] if ica.pca_mean_ is not None else np.zeros((n_channels, 1))
+
+    if ica.noise_cov is None:
+        # Per-channel standardization, after any active SSP projectors
+        whiten = np.diag(1. / ica.pre_whitener_.ravel())
+        unwhiten = np.diag(ica.pre_whitener_.ravel())
+        projs = [proj for proj in ica.info["projs"] if proj["active"]] if ica.info is not None else []
+        if projs:
+            projector, n_proj, _ = mne.io.proj.make_projector(projs, ica.info["ch_names"], include_active=True)
+            if n_proj:
+                whiten = whiten @ projector
+    else:
+        whiten = ica.pre_whitener_
+        unwhiten = np.linalg.pinv(ica.pre_whitener_, rcond=1e-14)
+
+    M = unwhiten @ P @ whiten
+    offset = unwhiten @ (mean - P @ mean)
+    return list(ica.ch_names), M, offset
+
+
+def apply_operator(data, M, offset, out=None):
+    """
+    Apply an operator from ica_operator to channels x samples data.
+
+    Pass ``out=data`` to overwrite the input.
+    """
+    result = M.astype(data.dtype, copy=False) @ data
+    result += offset.astype(data.dtype, copy=False)
+    if out is None:
+        return result
+    out[...] = result
+    return out
 
 # Add your module-specific functions and classes here
@@ -5,5 +5,6 @@ Description: [Insert module description here]
 """
 
 from .asr import *
+from .line_noise import *
 
-__all__ = ['apply_asr']
+__all__ = ['apply_asr', 'BatchASR', 'zapline', 'detect_line_noise']
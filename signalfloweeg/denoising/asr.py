@@ -1,112 +1,231 @@
 # Authors:  Ernest Pedapati (ernest.pedapati@cchmc.org)
 
-def run_autoreject_raw( raw ):
-    import autoreject
-    epochs = epoch_vep_hbcd(raw)
-    ar = autoreject.AutoReject(random_state=11,
-                            n_jobs=20, verbose=True)
-    ar.fit(epochs)  # fit on a few epochs to save time
-    epochs_ar, reject_log = ar.transform(epochs, return_log=True)
-
-    return epochs_ar, reject_log
-
-def run_autoreject( epochs ):
-    import autoreject
-    ar = autoreject.AutoReject(n_interpolate=[1, 2, 3, 4], random_state=11,
-                            n_jobs=30, verbose=True)
-    ar.fit(epochs)  # fit on a few epochs to save time
-    epochs_ar, reject_log = ar.transform(epochs, return_log=True)
-
-    return epochs_ar, reject_log
-
-def runStarCleaning( raw ):
-    from meegkit import star 
-    x_SC = raw.get_data().T   # Samples X Channels
-    y, w, _ = star.star(x_SC, 2)
-    raw_star = raw.copy()
-    raw_star._data = y.T
+def run_autoreject_raw( raw, **kwargs ):
+    from signalfloweeg.preprocessing.artifact_rejection.autoreject import run_autoreject_raw
+    return run_autoreject_raw(raw, **kwargs)
+
+def run_autoreject( epochs, **kwargs ):
+    from signalfloweeg.preprocessing.artifact_rejection.autoreject import run_autoreject
+    return run_autoreject(epochs, **kwargs)
+
+def runStarCleaning( raw, copy=True, out=None, dtype=None, report_memory=False ):
+    from meegkit import star
+    with peak_memory("STAR", report=report_memory):
+        raw_star = fill_output(raw, output_raw(raw, copy=copy, out=out, dtype=dtype))
+        x_SC = raw_star._data.T   # Samples X Channels, a view of the output buffer
+        y, w, _ = star.star(x_SC, 2)
+        np.copyto(raw_star._data, y.T, casting="same_kind")
     return raw_star
 
-def run_asr( raw ):
+def run_asr( raw, **kwargs ):
+    return apply_asr(raw, method="euclid", cutoff=20, **kwargs)
 
-    from meegkit.asr import ASR
-    from meegkit.utils.matrix import sliding_window
+from meegkit.asr import ASR
+from meegkit.utils.asr import yulewalk_filter
+import numpy as np
+import os
 
-    sfreq = int(raw.info['sfreq'])
-    nchan = raw.info['nchan']
+from signalfloweeg.utils.resources import peak_memory
 
-    raw_array = raw.get_data()
+from .buffers import fill_output, output_raw
+from .line_noise import detect_line_noise, zapline
 
-    # Train on a clean portion of data
-    asr = ASR(method="euclid", cutoff=20)
-    train_idx = np.arange(0 * sfreq, 20 * sfreq, dtype=int)
-    _, sample_mask = asr.fit(raw_array[:, train_idx])
 
-    # Apply filter using sliding (non-overlapping) windows
-    X = sliding_window(raw_array, window=int(sfreq), step=int(sfreq))
-    Y = np.zeros_like(X)
-    for i in range(X.shape[1]):
-        Y[:, i, :] = asr.transform(X[:, i, :])
+class BatchASR:
+    """
+    Artifact Subspace Reconstruction that cleans many windows per call.
 
-    raw_array = X.reshape(nchan, -1)  # reshape to (n_chans, n_times)
-    clean_array = Y.reshape(nchan, -1)
+    Calibration uses meegkit's ASR. Cleaning is vectorized: the data is split
+    into hops of ``win_len * (1 - win_overlap)`` seconds, each hop gets the
+    covariance of the trailing ``win_len`` window (so windows overlap when
+    ``win_overlap > 0``), all reconstruction matrices are computed with one
+    batched eigendecomposition, and consecutive matrices are crossfaded with a
+    raised cosine across each hop. Filter state and covariance history are
+    carried between calls, so a recording can be cleaned chunk by chunk.
 
-    raw_asr = raw.copy()
-    raw_asr._data = clean_array
-    return raw_asr
+    Each hop only uses the covariance of its trailing ``win_len`` window, without
+    meegkit's memory-weighted covariance history. The output therefore matches
+    meegkit's ``ASR.transform`` only when its ``memory`` equals one window;
+    with meegkit's default ``memory=2*sfreq`` the two differ slightly.
 
-from meegkit.asr import ASR
-from meegkit.utils.matrix import sliding_window
-import numpy as np
+    Parameters:
+    - sfreq (float): Sampling frequency of the data.
+    - method (str): ASR method used for calibration. Default is "euclid".
+    - cutoff (float): Standard-deviation cutoff for rejection. Default is 20.
+    - win_len (float): Covariance window length in seconds. Default is 1 second.
+    - win_overlap (float): Fraction of overlap between consecutive windows. Default is 0.
+    - max_dims (float): Maximum fraction of dimensions that can be reconstructed. Default is 0.66.
+    """
 
-def apply_asr(raw, method="euclid", cutoff=20, train_duration=20):
+    def __init__(self, sfreq, method="euclid", cutoff=20, win_len=1.0, win_overlap=0.0, max_dims=0.66):
+        self.sfreq = sfreq
+        self.method = method
+        self.cutoff = cutoff
+        self.win_len = win_len
+        self.win_overlap = win_overlap
+        self.max_dims = max_dims
+        self.hops_per_window = max(1, int(round(1 / (1 - win_overlap))))
+        self.hop = max(1, int(round(win_len * sfreq / self.hops_per_window)))
+        self.M_ = None
+        self.T_ = None
+        self.ch_names = None
+        self.reset()
+
+    def reset(self):
+        """Reset the streaming state, keeping the calibration."""
+        self.ab_ = ASR(sfreq=self.sfreq).ab_
+        self.zi_ = None
+        self.R_ = None
+        self._hop_covs = None
+
+    def fit(self, X, ch_names=None):
+        """
+        Calibrate on clean data of shape (n_channels, n_samples).
+        """
+        asr = ASR(sfreq=self.sfreq, method=self.method, cutoff=self.cutoff)
+        asr.fit(X)
+        self.M_ = asr.state_["M"]
+        self.T_ = asr.state_["T"]
+        self.ch_names = list(ch_names) if ch_names is not None else None
+        self.reset()
+        return self
+
+    def save(self, fname):
+        """
+        Save the calibration so it can be reused for the same subject or montage.
+        """
+        np.savez(fname, M=self.M_, T=self.T_, sfreq=self.sfreq, method=self.method, cutoff=self.cutoff,
+                 ch_names=np.array(self.ch_names if self.ch_names is not None else [], dtype=str))
+
+    @classmethod
+    def load(cls, fname, **kwargs):
+        """
+        Load a calibration saved with save(). Extra arguments set the windowing.
+        """
+        with np.load(fname) as saved:
+            asr = cls(float(saved["sfreq"]), method=str(saved["method"]), cutoff=float(saved["cutoff"]), **kwargs)
+            asr.M_ = saved["M"]
+            asr.T_ = saved["T"]
+            asr.ch_names = saved["ch_names"].tolist() or None
+        return asr
+
+    def _reconstruction_matrices(self, covs):
+        """Compute one reconstruction matrix per covariance, batched."""
+        n_chans = covs.shape[-1]
+        D, V = np.linalg.eigh(covs)
+        keep = D < np.sum(np.matmul(self.T_, V) ** 2, axis=-2)
+        keep |= np.arange(n_chans) < n_chans - int(np.floor(self.max_dims * n_chans + 0.5)) - 1
+
+        R = np.broadcast_to(np.eye(n_chans), covs.shape).copy()
+        reject = ~keep.all(axis=1)
+        if reject.any():
+            V_rej = V[reject]
+            demux = np.matmul(np.swapaxes(V_rej, -1, -2), self.M_) * keep[reject][:, :, None]
+            R[reject] = np.matmul(np.matmul(self.M_, np.linalg.pinv(demux)), np.swapaxes(V_rej, -1, -2))
+        return R
+
+    def transform(self, X):
+        """
+        Clean data of shape (n_channels, n_samples), continuing from the previous call.
+        """
+        if self.M_ is None:
+            raise RuntimeError("BatchASR is not calibrated. Call fit() or load() first.")
+
+        n_chans, n_samples = X.shape
+        X_filt, self.zi_ = yulewalk_filter(X, sfreq=self.sfreq, ab=self.ab_, zi=self.zi_)
+
+        # Pad to whole hops; padded samples add nothing to the covariances
+        n_hops = -(-n_samples // self.hop)
+        pad = n_hops * self.hop - n_samples
+        X_hops = np.pad(X, ((0, 0), (0, pad))).reshape(n_chans, n_hops, self.hop).transpose(1, 0, 2)
+        F_hops = np.pad(X_filt, ((0, 0), (0, pad))).reshape(n_chans, n_hops, self.hop).transpose(1, 0, 2)
+        counts = np.full(n_hops, self.hop)
+        counts[-1] -= pad
+
+        # Trailing-window covariance per hop from running sums of hop outer products
+        hop_covs = np.einsum('hct,hdt->hcd', F_hops, F_hops)
+        if self._hop_covs is not None:
+            hop_covs = np.concatenate([self._hop_covs[0], hop_covs])
+            counts = np.concatenate([self._hop_covs[1], counts])
+        n_prev = hop_covs.shape[0] - n_hops
+        cum_covs = np.cumsum(hop_covs, axis=0)
+        cum_counts = np.cumsum(counts)
+        ends = np.arange(n_prev, n_prev + n_hops)
+        starts = ends - self.hops_per_window
+        window_covs = cum_covs[ends] - np.where(starts[:, None, None] >= 0, cum_covs[np.maximum(starts, 0)], 0)
+        window_counts = cum_counts[ends] - np.where(starts >= 0, cum_counts[np.maximum(starts, 0)], 0)
+        window_covs /= window_counts[:, None, None]
+        keep_prev = self.hops_per_window - 1
+        self._hop_covs = (hop_covs[hop_covs.shape[0] - keep_prev:], counts[counts.shape[0] - keep_prev:]) \
+            if keep_prev else None
+
+        R = self._reconstruction_matrices(window_covs)
+        R_prev = np.concatenate([(R[:1] if self.R_ is None else self.R_[None]), R[:-1]])
+        self.R_ = R[-1]
+
+        # Raised-cosine crossfade from the previous hop's matrix to the current one
+        blend = (1 - np.cos(np.pi * np.arange(1, self.hop + 1) / self.hop)) / 2
+        clean = blend * np.matmul(R, X_hops) + (1 - blend) * np.matmul(R_prev, X_hops)
+        return clean.transpose(1, 0, 2).reshape(n_chans, -1)[:, :n_samples]
+
+
+def apply_asr(raw, method="euclid", cutoff=20, train_duration=20, win_len=1.0, win_overlap=0.0,
+              calibration=None, chunk_seconds=60, copy=True, out=None, dtype=None, report_memory=False):
     """
     Apply Artifact Subspace Reconstruction (ASR) to EEG data.
 
+    Cleaning uses BatchASR, which estimates each window's covariance from that
+    window alone. Results differ from meegkit's ASR.transform when its memory
+    is longer than one window (e.g. its default of 2 seconds).
+
     Parameters:
     - raw (mne.io.Raw): Raw EEG data object.
     - method (str): ASR method to use. Default is "euclid".
     - cutoff (float): Cutoff frequency for ASR in Hz. Default is 20 Hz.
     - train_duration (int): Duration of clean data used for training ASR in seconds. Default is 20 seconds.
+    - win_len (float): ASR window length in seconds. Default is 1 second.
+    - win_overlap (float): Fraction of overlap between windows, crossfaded when cleaning. Default is 0.
+    - calibration (str): Path to a saved calibration (.npz). Loaded if it exists, otherwise
+      the calibration is fitted and saved there. Default is None (always fit).
+    - chunk_seconds (float): Amount of data cleaned per batch, in seconds. Default is 60 seconds.
+    - copy (bool): If False, clean the samples of raw in place. Default is True.
+    - out (numpy.ndarray): Preallocated channels x samples array to hold the result.
+    - dtype (numpy.dtype): Dtype of the result, e.g. np.float32. Default keeps the input dtype.
+    - report_memory (bool): Print the peak memory allocated while cleaning. Default is False.
 
     Returns:
     - raw_asr (mne.io.Raw): Raw EEG data object with ASR applied.
     """
-    sfreq = int(raw.info['sfreq'])
-    nchan = raw.info['nchan']
-
-    raw_array = raw.get_data()
-
-    # Train on a clean portion of data
-    asr = ASR(method=method, cutoff=cutoff)
-    train_idx = np.arange(0 * sfreq, train_duration * sfreq, dtype=int)
-    _, sample_mask = asr.fit(raw_array[:, train_idx])
+    with peak_memory("ASR", report=report_memory):
+        return _apply_asr(raw, method, cutoff, train_duration, win_len, win_overlap,
+                          calibration, chunk_seconds, output_raw(raw, copy=copy, out=out, dtype=dtype))
 
-    # Apply filter using sliding (non-overlapping) windows
-    X = sliding_window(raw_array, window=int(sfreq), step=int(sfreq))
-    Y = np.zeros_like(X)
-    for i in range(X.shape[1]):
-        Y[:, i, :] = asr.transform(X[:, i, :])
+def _apply_asr(raw, method, cutoff, train_duration, win_len, win_overlap, calibration, chunk_seconds, raw_asr):
+    from signalfloweeg.io.chunks import iter_chunks
 
-    raw_array = X.reshape(nchan, -1)  # reshape to (n_chans, n_times)
-    clean_array = Y.reshape(nchan, -1)
+    sfreq = int(raw.info['sfreq'])
 
-    raw_asr = raw.copy()
-    raw_asr._data = clean_array
+    if calibration is not None and os.path.isfile(calibration):
+        asr = BatchASR.load(calibration, win_len=win_len, win_overlap=win_overlap)
+        if asr.ch_names is not None and asr.ch_names != raw.ch_names:
+            raise ValueError(f"Calibration {calibration} was fitted on different channels.")
+        print(f"Loaded ASR calibration from {calibration}")
+    else:
+        # Train on a clean portion of data
+        asr = BatchASR(sfreq, method=method, cutoff=cutoff, win_len=win_len, win_overlap=win_overlap)
+        asr.fit(raw.get_data(start=0, stop=train_duration * sfreq), ch_names=raw.ch_names)
+        if calibration is not None:
+            asr.save(calibration)
+
+    # Clean in chunks of whole hops so the window grid is continuous across chunks.
+    # Each chunk is read before it is written, so raw_asr may share raw's buffer.
+    chunk_hops = max(1, int(chunk_seconds * sfreq) // asr.hop)
+    for chunk in iter_chunks(raw, chunk_seconds=chunk_hops * asr.hop / raw.info['sfreq']):
+        raw_asr._data[:, chunk.start:chunk.stop] = asr.transform(chunk.data)
 
     return raw_asr
 
-def run_zapline(raw):
-    from meegkit import dss
-
-    fline = int(60)
-    data = raw.get_data().T # Convert mne data to numpy darray
-    sfreq = raw.info['sfreq'] # Extract the sampling freq
-    nchan = raw.info['nchan']
-
-    #Apply MEEGkit toolbox function
-    out, _ = dss.dss_line(data, fline, sfreq, nkeep=1) # fline (Line noise freq) = 50 Hz for Europe
-
-    raw_zapline = raw.copy()
-    raw_zapline._data = out.T
-    return raw_zapline
\ No newline at end of file
+def run_zapline(raw, fline=None, copy=True, out=None, dtype=None, report_memory=False, **kwargs):
+    # fline (Line noise freq) = 50 Hz for Europe; detected from the spectrum when None
+    return zapline(raw, fline=fline, nkeep=1, copy=copy, out=out, dtype=dtype,
+                   report_memory=report_memory, **kwargs)
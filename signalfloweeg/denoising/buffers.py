@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Module: buffers
+Description: Output buffers for denoising steps that avoid copying recordings
+"""
+
+import numpy as np
+
+
+def output_raw(raw, copy=True, out=None, dtype=None):
+    """
+    Return the Raw object a denoising step writes its result into.
+
+    The returned object's ``_data`` is meant to be overwritten completely, so
+    it is never filled with a copy of the input samples.
+
+    Parameters:
+    - raw (mne.io.Raw): The input Raw EEG data object.
+    - copy (bool): If False, the result replaces the samples of ``raw`` in place.
+      Non-preloaded data is loaded first. Default is True.
+    - out (numpy.ndarray): Preallocated channels x samples array (e.g. a numpy.memmap)
+      to hold the result. It becomes the data buffer of the returned Raw object.
+    - dtype (numpy.dtype): Dtype of the result, e.g. np.float32 to halve memory.
+      Default keeps the dtype of the input (float64 if not preloaded).
+
+    Returns:
+    - raw_out (mne.io.Raw): The Raw object whose buffer receives the result.
+    """
+    shape = (len(raw.ch_names), raw.n_times)
+    if out is not None:
+        if out.shape != shape:
+            raise ValueError(f"out has shape {out.shape}, expected {shape}.")
+        if dtype is not None and out.dtype != np.dtype(dtype):
+            raise ValueError(f"out has dtype {out.dtype}, expected {np.dtype(dtype)}.")
+
+    if not copy and out is None:
+        if not raw.preload:
+            raw.load_data()
+        if dtype is not None and raw._data.dtype != np.dtype(dtype):
+            # The buffer is converted once; later in-place steps keep the new dtype
+            raw._data = raw._data.astype(dtype)
+        return raw
+
+    # Copy everything but the samples, which the caller fills in
+    data = getattr(raw, "_data", None)
+    raw._data = None
+    try:
+        raw_out = raw.copy()
+    finally:
+        raw._data = data
+
+    if out is None:
+        if dtype is None:
+            dtype = data.dtype if raw.preload else np.float64
+        out = np.empty(shape, dtype=dtype)
+    raw_out._data = out
+    raw_out.preload = True
+    return raw_out
+
+
+def fill_output(raw, raw_out, chunk_seconds=60):
+    """
+    Copy the samples of ``raw`` into the buffer returned by output_raw.
+
+    Used by steps that work on their input in place. Non-preloaded data is
+    read chunk by chunk, so no second full-size array is allocated.
+    """
+    if raw_out is raw:
+        return raw_out
+    if raw.preload:
+        np.copyto(raw_out._data, raw._data, casting="same_kind")
+        return raw_out
+
+    from signalfloweeg.io.chunks import iter_chunks
+    for chunk in iter_chunks(raw, chunk_seconds=chunk_seconds):
+        raw_out._data[:, chunk.start:chunk.stop] = chunk.data
+    return raw_out
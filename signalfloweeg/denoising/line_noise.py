@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Module: line_noise
+Description: Line-noise detection and chunked Zapline removal
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import lfilter, welch
+
+from signalfloweeg.io.chunks import iter_chunks, read_samples
+from signalfloweeg.utils.resources import peak_memory, suggest_n_jobs
+
+from .buffers import fill_output, output_raw
+
+# Mains frequencies considered when none is given
+LINE_FREQUENCIES = (50.0, 60.0)
+
+
+def detect_line_noise(raw, candidates=LINE_FREQUENCIES, threshold_db=6.0, n_windows=5, window_seconds=10.0):
+    """
+    Detect the power-line frequency and its harmonics from the spectrum.
+
+    The channel-averaged log spectrum is estimated on a few windows spread over
+    the recording. A frequency counts as line noise when its peak stands at
+    least ``threshold_db`` above the median of the surrounding 1-5 Hz.
+
+    Parameters:
+    - raw (mne.io.Raw): Raw EEG data object. Only the sampled windows are read.
+    - candidates (tuple): Fundamental frequencies to test, in Hz. Default is (50, 60).
+    - threshold_db (float): Minimum peak prominence in dB. Default is 6 dB.
+    - n_windows (int): Number of windows sampled from the recording. Default is 5.
+    - window_seconds (float): Length of each window in seconds. Default is 10 seconds.
+
+    Returns:
+    - fline (float): The detected line frequency, or None if no candidate has a peak.
+    - harmonics (numpy.ndarray): Detected line-noise frequencies (fundamental and harmonics).
+    """
+    sfreq = raw.info['sfreq']
+    window = min(int(window_seconds * sfreq), raw.n_times)
+    nperseg = min(window, int(4 * sfreq))
+    starts = np.linspace(0, raw.n_times - window, n_windows).astype(int)
+
+    psd = 0
+    for start in np.unique(starts):
+        data = read_samples(raw, start=start, stop=start + window)
+        freqs, pxx = welch(data, fs=sfreq, nperseg=nperseg, axis=-1)
+        psd = psd + pxx
+    log_psd = 10 * np.log10(np.mean(psd, axis=0) + np.finfo(float).tiny)
+
+    def prominence(freq):
+        peak = np.abs(freqs - freq) <= 0.5
+        distance = np.abs(freqs - freq)
+        flank = (distance >= 1) & (distance <= 5)
+        if not peak.any() or not flank.any():
+            return -np.inf
+        return log_psd[peak].max() - np.median(log_psd[flank])
+
+    nyquist = sfreq / 2
+    scores = {freq: prominence(freq) for freq in candidates if freq + 5 < nyquist}
+    if not scores or max(scores.values()) < threshold_db:
+        return None, np.array([])
+
+    fline = max(scores, key=scores.get)
+    harmonics = np.arange(fline, nyquist - 5, fline)
+    harmonics = harmonics[[prominence(freq) >= threshold_db for freq in harmonics]]
+    return fline, harmonics
+
+
+@lru_cache(maxsize=16)
+def _moving_average_kernel(window_len):
+    # Causal moving average over a fractional number of samples, as in meegkit's smooth
+    frac, n = np.modf(window_len)
+    kernel = np.r_[np.ones(int(n)), frac]
+    return kernel / kernel.sum()
+
+
+@lru_cache(maxsize=16)
+def _harmonic_gains(n_times, sfreq, harmonics, fwhm=1.0):
+    # Frequency-domain Gaussians centred on each harmonic, as in meegkit's gaussfilt
+    freqs = np.fft.rfftfreq(n_times, 1. / sfreq)
+    width = fwhm * (2 * np.pi - 1) / (4 * np.pi)
+    return sum(np.exp(-.5 * ((freqs - freq) / width) ** 2) for freq in harmonics)
+
+
+def _line_residual(data, sfreq, fline):
+    """Remove the line cycle average, leaving line noise plus residual signal."""
+    return data - lfilter(_moving_average_kernel(sfreq / fline), 1, data, axis=-1)
+
+
+def _covariances(chunk, sfreq, fline, harmonics):
+    """Residual and line-biased covariances over the core of a chunk."""
+    residual = _line_residual(chunk.data, sfreq, fline)
+    gains = _harmonic_gains(residual.shape[-1], sfreq, harmonics)
+    biased = np.fft.irfft(np.fft.rfft(residual, axis=-1) * gains, n=residual.shape[-1], axis=-1)
+    residual, biased = residual[:, chunk.core], biased[:, chunk.core]
+    return residual @ residual.T, biased @ biased.T
+
+
+def _map_threads(func, items, n_jobs):
+    """
+    Apply func to items in a thread pool, yielding (item, result) in order.
+
+    At most n_jobs + 1 items are held at once, and item k + 1 is always taken
+    from the iterator before the result for item k is yielded.
+    """
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        pending = deque()
+        for item in items:
+            pending.append((item, pool.submit(func, item)))
+            if len(pending) > n_jobs:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+
+
+def zapline(raw, fline=None, nremove=1, nkeep=None, chunk_seconds=60, n_jobs=None,
+            copy=True, out=None, dtype=None, report_memory=False):
+    """
+    Remove power-line noise with Zapline, processing the recording in chunks.
+
+    The spatial filter is fitted once from covariances accumulated over all
+    chunks, so every chunk is cleaned with the same filter. Chunks are
+    processed concurrently in a thread pool, in two passes over the data.
+
+    Parameters:
+    - raw (mne.io.Raw): Raw EEG data object. Non-preloaded data is read chunk by chunk.
+    - fline (float): Line frequency in Hz. Detected from the spectrum if None.
+    - nremove (int): Number of line-noise components to remove. Default is 1.
+    - nkeep (int): Number of principal components of the residual kept before DSS.
+      Default keeps all.
+    - chunk_seconds (float): Length of each chunk in seconds. Default is 60 seconds.
+    - n_jobs (int): Number of threads. Default uses all available cores.
+    - copy (bool): If False, clean the samples of raw in place. Default is True.
+    - out (numpy.ndarray): Preallocated channels x samples array to hold the result.
+    - dtype (numpy.dtype): Dtype of the result, e.g. np.float32. Default keeps the input dtype.
+    - report_memory (bool): Print the peak memory allocated while cleaning. Default is False.
+
+    Returns:
+    - raw_zapline (mne.io.Raw): Raw EEG data object with line noise removed.
+    """
+    from meegkit.dss import dss0
+    from meegkit.utils import pca
+
+    sfreq = raw.info['sfreq']
+    with peak_memory("Zapline", report=report_memory):
+        if fline is None:
+            fline, harmonics = detect_line_noise(raw)
+            if fline is None:
+                print("No line noise detected, skipping Zapline")
+                return fill_output(raw, output_raw(raw, copy=copy, out=out, dtype=dtype))
+            print(f"Detected {fline:g} Hz line noise at {', '.join(f'{f:g}' for f in harmonics)} Hz")
+        else:
+            harmonics = np.arange(fline, sfreq / 2, fline)
+        harmonics = tuple(float(freq) for freq in harmonics)
+
+        # Enough context for the moving average and the spectral bias filter
+        overlap_seconds = max(1.0, 2.0 / fline)
+        chunk_seconds = max(chunk_seconds, 2 * overlap_seconds)
+        n_jobs = suggest_n_jobs(n_jobs, bytes_per_job=8 * 8 * len(raw.ch_names) * chunk_seconds * sfreq)
+
+        # Pass 1: accumulate the residual and line-biased covariances
+        c0 = c1 = 0
+        chunks = iter_chunks(raw, chunk_seconds=chunk_seconds, overlap_seconds=overlap_seconds)
+        for _, (cov0, cov1) in _map_threads(lambda chunk: _covariances(chunk, sfreq, fline, harmonics),
+                                            chunks, n_jobs):
+            c0 = c0 + cov0
+            c1 = c1 + cov1
+
+        # DSS in the space of the strongest residual components
+        V, _ = pca(c0, nkeep)
+        todss, _, _, _ = dss0(V.T @ c0 @ V, V.T @ c1 @ V)
+        W = V @ todss[:, :nremove]
+
+        # Regress the line components out of the residual: artifact = P.T @ residual
+        P = W @ np.linalg.pinv(W.T @ c0 @ W) @ W.T @ c0
+        power_removed = np.trace(P.T @ c0 @ P) / np.trace(c0)
+        print(f"Power of residual removed by Zapline: {power_removed:.2f}")
+
+        # Pass 2: apply the same spatial filter to every chunk
+        raw_zapline = output_raw(raw, copy=copy, out=out, dtype=dtype)
+
+        def clean(chunk):
+            residual = _line_residual(chunk.data, sfreq, fline)[:, chunk.core]
+            return chunk.core_data - P.T @ residual
+
+        chunks = iter_chunks(raw, chunk_seconds=chunk_seconds, overlap_seconds=overlap_seconds)
+        for chunk, cleaned in _map_threads(clean, chunks, n_jobs):
+            raw_zapline._data[:, chunk.start:chunk.stop] = cleaned
+    return raw_zapline
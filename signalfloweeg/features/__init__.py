@@ -4,6 +4,8 @@ Module: features
 Description: [Insert module description here]
 """
 
-from . import *
+from .frequency_domain import *
+from .time_frequency import *
 
-__all__ = []
+__all__ = ['compute_psd', 'welch_psd', 'multitaper_psd', 'bandpower', 'bandpower_table', 'BANDS',
+           'tfr_morlet', 'morlet_bank', 'morlet_wavelet', 'TFRAccumulator']
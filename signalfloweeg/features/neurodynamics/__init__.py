@@ -4,6 +4,10 @@ Module: neurodynamics
 Description: [Insert module description here]
 """
 
-from . import *
+from .fooof import *
+from .spectral_events import *
+from .pac import *
 
-__all__ = []
+__all__ = ['fit_fooof_group', 'fooof_models', 'fooof_dtype',
+           'find_spectral_events', 'spectral_events_table',
+           'compute_pac', 'pac_surrogate_stats', 'analytic_bands']
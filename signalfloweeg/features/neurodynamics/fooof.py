@@ -1,15 +1,188 @@
 # -*- coding: utf-8 -*-
 """
 Module: fooof
-Description: [Insert module description here]
+Description: Parallel FOOOF fitting of many power spectra into structured arrays
 """
 
 # Imports
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import mne
 
-# Functions and classes
-def dummy_function():
-    pass
+from signalfloweeg.utils.resources import suggest_n_jobs
+
+# Chunks submitted per worker, to balance load across processes
+FOOOF_CHUNKS_PER_JOB = 4
+
+
+def fooof_dtype(max_n_peaks=5, aperiodic_mode="fixed"):
+    """
+    Return the structured dtype holding one FOOOF fit.
+
+    Fields are 'aperiodic' (offset, [knee,] exponent), 'peaks' (CF, PW, BW
+    per peak, as FOOOF.peak_params_), 'gaussians' (center, height, std per
+    peak, as FOOOF.gaussian_params_), 'n_peaks', 'r_squared' and 'error'.
+    Unused peak rows and failed fits are NaN.
+
+    Parameters:
+    - max_n_peaks (int): Number of peak rows stored per fit.
+    - aperiodic_mode (str): "fixed" or "knee".
+
+    Returns:
+    - numpy.dtype: The structured dtype.
+    """
+    if not np.isfinite(max_n_peaks):
+        raise ValueError("max_n_peaks must be finite to store peaks in a fixed-size array.")
+    n_aperiodic = 3 if aperiodic_mode == "knee" else 2
+    return np.dtype([
+        ('aperiodic', 'f8', (n_aperiodic,)),
+        ('peaks', 'f8', (int(max_n_peaks), 3)),
+        ('gaussians', 'f8', (int(max_n_peaks), 3)),
+        ('n_peaks', 'i4'),
+        ('r_squared', 'f8'),
+        ('error', 'f8'),
+    ])
+
+
+def _fit_series(freqs, series, settings, warm_start):
+    """
+    Fit a block of series x spectra with one FOOOF object (runs in a worker).
+
+    With warm_start, each fit starts its aperiodic search from the previous
+    spectrum of the same series.
+    """
+    from fooof import FOOOF
+
+    fm = FOOOF(**settings, verbose=False)
+    # Failed or NaN spectra give NaN results instead of raising
+    fm.set_check_data_mode(False)
+    fm.add_data(freqs, np.ones(len(freqs)))
+
+    results = np.zeros(series.shape[:2], dtype=fooof_dtype(settings['max_n_peaks'], settings['aperiodic_mode']))
+    results['n_peaks'] = 0
+    for field in ('aperiodic', 'peaks', 'gaussians', 'r_squared', 'error'):
+        results[field] = np.nan
+
+    log_series = np.log10(series)
+    for idx, spectra in enumerate(log_series):
+        fm._ap_guess = (None, 0, None)
+        for jdx, spectrum in enumerate(spectra):
+            fm.fit(power_spectrum=spectrum)
+            if not fm.has_model:
+                continue
+            n_peaks = len(fm.peak_params_)
+            result = results[idx, jdx]
+            result['aperiodic'] = fm.aperiodic_params_
+            result['peaks'][:n_peaks] = fm.peak_params_
+            result['gaussians'][:n_peaks] = fm.gaussian_params_
+            result['n_peaks'] = n_peaks
+            result['r_squared'] = fm.r_squared_
+            result['error'] = fm.error_
+            if warm_start:
+                params = fm.aperiodic_params_
+                fm._ap_guess = (params[0], params[1] if len(params) == 3 else 0, params[-1])
+    return results
+
+
+def fit_fooof_group(psd, freqs, freq_range=None, peak_width_limits=(2, 5), max_n_peaks=5, min_peak_height=0.0,
+                    peak_threshold=2.0, aperiodic_mode="fixed", warm_start_axis=None, n_jobs=None, chunk_size=None):
+    """
+    Fit FOOOF models to every spectrum of a (subjects x epochs x channels) array.
+
+    Spectra are split into chunks and fitted in a process pool, one FOOOF
+    object per chunk. With warm_start_axis, spectra along that axis (e.g.
+    consecutive epochs of a channel) are fitted in sequence, each starting
+    its aperiodic fit from the previous result.
+
+    Parameters:
+    - psd (numpy.ndarray): Power spectral densities (linear power), shape (..., n_freqs).
+    - freqs (numpy.ndarray): The frequencies in Hz.
+    - freq_range (list): [low, high] frequency range to fit, inclusive. Default
+      is all frequencies above 0 Hz.
+    - peak_width_limits, max_n_peaks, min_peak_height, peak_threshold, aperiodic_mode:
+      FOOOF settings. max_n_peaks must be finite.
+    - warm_start_axis (int): Axis of psd (not the frequency axis) along which fits are
+      warm-started from their neighbour. Default is no warm start.
+    - n_jobs (int): Number of worker processes. Default uses all available cores.
+    - chunk_size (int): Series fitted per task. Default spreads the work over
+      FOOOF_CHUNKS_PER_JOB tasks per worker.
+
+    Returns:
+    - params (numpy.ndarray): Structured array of shape psd.shape[:-1], see fooof_dtype.
+    - freqs (numpy.ndarray): The fitted frequencies.
+    """
+    psd = np.asarray(psd)
+    freqs = np.asarray(freqs, dtype=float)
+    low, high = (0.0, np.inf) if freq_range is None else freq_range
+    keep = (freqs >= low) & (freqs <= high) & (freqs > 0)
+    settings = {
+        'peak_width_limits': tuple(peak_width_limits),
+        'max_n_peaks': int(max_n_peaks) if np.isfinite(max_n_peaks) else max_n_peaks,
+        'min_peak_height': min_peak_height,
+        'peak_threshold': peak_threshold,
+        'aperiodic_mode': aperiodic_mode,
+    }
+    dtype = fooof_dtype(max_n_peaks, aperiodic_mode)
+
+    # Series x neighbours x freqs, with the warm-start axis next to the frequencies
+    lead_shape = psd.shape[:-1]
+    if warm_start_axis is not None:
+        warm_start_axis = warm_start_axis % len(lead_shape)
+        psd = np.moveaxis(psd, warm_start_axis, -2)
+    series = psd.reshape(-1, psd.shape[-2] if warm_start_axis is not None else 1, psd.shape[-1])
+
+    n_series = len(series)
+    n_jobs = min(suggest_n_jobs(n_jobs), max(n_series, 1))
+    if chunk_size is None:
+        chunk_size = -(-n_series // (n_jobs * FOOOF_CHUNKS_PER_JOB)) if n_series else 1
+    starts = range(0, n_series, chunk_size)
+    blocks = (series[start:start + chunk_size][..., keep] for start in starts)
+    warm_start = warm_start_axis is not None
+
+    results = np.empty(series.shape[:2], dtype=dtype)
+    if n_jobs == 1:
+        for start, block in zip(starts, blocks):
+            results[start:start + len(block)] = _fit_series(freqs[keep], block, settings, warm_start)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [pool.submit(_fit_series, freqs[keep], block, settings, warm_start) for block in blocks]
+            for start, future in zip(starts, futures):
+                block_results = future.result()
+                results[start:start + len(block_results)] = block_results
+
+    if warm_start_axis is not None:
+        moved_shape = tuple(np.delete(lead_shape, warm_start_axis)) + (lead_shape[warm_start_axis],)
+        return np.moveaxis(results.reshape(moved_shape), -1, warm_start_axis), freqs[keep]
+    return results.reshape(lead_shape), freqs[keep]
+
+
+def fooof_models(params, freqs):
+    """
+    Regenerate aperiodic and full model spectra from stored FOOOF parameters.
+
+    All fits are evaluated together with broadcasting, in log10 power as
+    FOOOF.fooofed_spectrum_.
+
+    Parameters:
+    - params (numpy.ndarray): Structured array from fit_fooof_group.
+    - freqs (numpy.ndarray): The fitted frequencies.
+
+    Returns:
+    - aperiodic (numpy.ndarray): Aperiodic fits, shape params.shape + (n_freqs,).
+    - model (numpy.ndarray): Full model fits (aperiodic plus peaks), same shape.
+    """
+    freqs = np.asarray(freqs, dtype=float)
+    aperiodic_params = params['aperiodic'][..., np.newaxis]
+    offset, exponent = aperiodic_params[..., 0, :], aperiodic_params[..., -1, :]
+    knee = aperiodic_params[..., 1, :] if aperiodic_params.shape[-2] == 3 else 0.
+    aperiodic = offset - np.log10(knee + freqs ** exponent)
+
+    # Peaks x freqs Gaussians, with unused (NaN) peak rows contributing nothing
+    gaussians = params['gaussians'][..., np.newaxis]
+    center, height, std = gaussians[..., 0, :], gaussians[..., 1, :], gaussians[..., 2, :]
+    peaks = height * np.exp(-(freqs - center) ** 2 / (2 * std ** 2))
+    model = aperiodic + np.nansum(peaks, axis=-2)
+    return aperiodic, model
 
 # Add your module-specific functions and classes here
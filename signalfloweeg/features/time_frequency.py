@@ -1,15 +1,311 @@
 # -*- coding: utf-8 -*-
 """
 Module: time_frequency
-Description: [Insert module description here]
+Description: Batched Morlet wavelet time-frequency transforms with cached wavelet banks
 """
 
 # Imports
+from functools import lru_cache
+
 import numpy as np
 import mne
+from scipy import fft
+
+# Upper bound on the temporary memory of one batch of convolutions
+TFR_BATCH_BYTES = 256 * 2**20
+
+# Wavelets extend this many standard deviations on either side of their centre
+MORLET_SUPPORT = 3.5
+
+
+def morlet_wavelet(sfreq, freq, n_cycles=7):
+    """
+    Return a complex Morlet wavelet with unit area under its Gaussian envelope.
+
+    This is the wavelet of spectralevents.morlet: standard deviation
+    n_cycles / (2 pi freq) seconds, sampled over +-MORLET_SUPPORT standard deviations.
+
+    Parameters:
+    - sfreq (float): Sampling frequency in Hz.
+    - freq (float): Centre frequency in Hz.
+    - n_cycles (float): Number of cycles. Default is 7.
+
+    Returns:
+    - numpy.ndarray: The complex wavelet samples.
+    """
+    st = n_cycles / (2 * np.pi * freq)
+    t = np.arange(-MORLET_SUPPORT * st, MORLET_SUPPORT * st, 1. / sfreq)
+    return np.exp(-t ** 2 / (2 * st ** 2)) * np.exp(2j * np.pi * freq * t) / (st * np.sqrt(2 * np.pi))
+
+
+@lru_cache(maxsize=16)
+def _morlet_bank(sfreq, freqs, n_cycles, n_times):
+    wavelets = [morlet_wavelet(sfreq, freq, cycles) for freq, cycles in zip(freqs, n_cycles)]
+    n_fft = fft.next_fast_len(n_times + max(len(wavelet) for wavelet in wavelets) - 1)
+
+    # Centre each wavelet on sample 0, so the first n_times samples of the
+    # circular convolution are the 'same'-mode linear convolution
+    kernels = np.zeros((len(freqs), n_fft), dtype=complex)
+    for idx, wavelet in enumerate(wavelets):
+        center = -(-len(wavelet) // 2) - 1
+        kernels[idx, :len(wavelet)] = wavelet
+        kernels[idx] = np.roll(kernels[idx], -center)
+
+    # Real and imaginary parts are convolved separately, so real signals need only rFFTs
+    bank = fft.rfft(np.concatenate([kernels.real, kernels.imag]), axis=-1)
+    bank.setflags(write=False)
+    return bank, n_fft
+
+
+def morlet_bank(sfreq, freqs, n_cycles=7, n_times=None):
+    """
+    Return the frequency-domain Morlet wavelet bank for signals of n_times samples.
+
+    Banks are cached by (sfreq, freqs, n_cycles, n_times), so repeated
+    transforms of equally long signals (channels, trials, subjects) reuse
+    the same bank.
+
+    Parameters:
+    - sfreq (float): Sampling frequency in Hz.
+    - freqs (array-like): Wavelet frequencies in Hz.
+    - n_cycles (float or array-like): Cycles per wavelet, one value or one per frequency.
+    - n_times (int): Samples per signal.
+
+    Returns:
+    - bank (numpy.ndarray): Read-only (2 * n_freqs) x (n_fft // 2 + 1) rFFTs of the real
+      parts, then the imaginary parts, of the centred wavelets.
+    - n_fft (int): The FFT length.
+    """
+    freqs = tuple(float(freq) for freq in np.atleast_1d(freqs))
+    n_cycles = tuple(float(cycles) for cycles in np.broadcast_to(n_cycles, len(freqs)))
+    return _morlet_bank(float(sfreq), freqs, n_cycles, int(n_times))
+
+
+def tfr_morlet(data, freqs, sfreq, n_cycles=7, output="power", decim=1, dtype=np.float64,
+               batch_bytes=TFR_BATCH_BYTES):
+    """
+    Compute the Morlet wavelet transform of many signals in batches.
+
+    Each batch of signals takes one rFFT and one irFFT (over all frequencies,
+    real and imaginary wavelet parts stacked). The complex coefficients are
+    dt * (x * w), so a sinusoid of amplitude A has |coefficient| close to A / 2;
+    power is 2 * |coefficient| ** 2, as in spectralevents.tfr. With
+    output="power" no complex array is ever stored.
+
+    Parameters:
+    - data (numpy.ndarray): Real signals, shape (..., n_times).
+    - freqs (array-like): Wavelet frequencies in Hz.
+    - sfreq (float): Sampling frequency in Hz.
+    - n_cycles (float or array-like): Cycles per wavelet, one value or one per frequency.
+      Default is 7.
+    - output (str): "power" or "complex".
+    - decim (int): Keep every decim-th time sample of the result. Default is 1.
+    - dtype (numpy.dtype): Real precision of the computation and output: np.float32 gives
+      float32 power or complex64 coefficients. Default is float64.
+    - batch_bytes (int): Approximate bound on temporary memory per batch.
+
+    Returns:
+    - numpy.ndarray: Power or complex coefficients, shape (..., n_freqs, ceil(n_times / decim)).
+    """
+    if output not in ("power", "complex"):
+        raise ValueError(f"Unknown output '{output}', expected 'power' or 'complex'.")
+    data = np.asarray(data)
+    real_dtype = np.dtype(np.float32 if np.dtype(dtype) in (np.float32, np.complex64) else np.float64)
+    complex_dtype = np.result_type(real_dtype, np.complex64)
+
+    n_times = data.shape[-1]
+    freqs = np.atleast_1d(freqs)
+    n_freqs = len(freqs)
+    bank, n_fft = morlet_bank(sfreq, freqs, n_cycles=n_cycles, n_times=n_times)
+    bank = bank.astype(complex_dtype, copy=False)
+    times = slice(0, n_times, int(decim))
+    n_out = len(range(n_times)[times])
+
+    rows = data.reshape(-1, n_times)
+    out = np.empty((len(rows), n_freqs, n_out), dtype=real_dtype if output == "power" else complex_dtype)
+    step = max(1, int(batch_bytes // (2 * n_freqs * n_fft * 2 * real_dtype.itemsize)))
+    for start in range(0, len(rows), step):
+        spectra = fft.rfft(rows[start:start + step].astype(real_dtype, copy=False), n=n_fft, axis=-1)
+        parts = fft.irfft(spectra[:, np.newaxis] * bank, n=n_fft, axis=-1)[..., times]
+        parts /= sfreq
+        real, imag = parts[:, :n_freqs], parts[:, n_freqs:]
+        if output == "power":
+            np.square(real, out=real)
+            real += np.square(imag)
+            np.multiply(real, 2, out=out[start:start + step])
+        else:
+            out[start:start + step].real = real
+            out[start:start + step].imag = imag
+    return out.reshape(data.shape[:-1] + (n_freqs, n_out))
+
+
+class TFRAccumulator:
+    """
+    Streaming inter-trial coherence and ERSP over trials.
+
+    Trials are transformed with tfr_morlet in batches and folded into running
+    sums of power and unit phase vectors per channel, frequency and time, so
+    memory holds the sums plus one batch of complex coefficients instead of
+    the complex TFR of every trial.
+
+    Parameters:
+    - freqs (array-like): Wavelet frequencies in Hz.
+    - sfreq (float): Sampling frequency in Hz.
+    - n_cycles (float or array-like): Cycles per wavelet. Default is 7.
+    - decim (int): Keep every decim-th time sample. Default is 1.
+    - tmin (float): Time of the first sample of each trial in seconds, for baselines.
+    - dtype (numpy.dtype): Precision of the transform and of the sums. Default is float64.
+    - batch_bytes (int): Approximate bound on the complex coefficients held per batch of trials.
+    """
+
+    def __init__(self, freqs, sfreq, n_cycles=7, decim=1, tmin=0.0, dtype=np.float64,
+                 batch_bytes=TFR_BATCH_BYTES):
+        self.freqs = np.atleast_1d(np.asarray(freqs, dtype=float))
+        self.sfreq = float(sfreq)
+        self.n_cycles = n_cycles
+        self.decim = int(decim)
+        self.tmin = tmin
+        self.dtype = np.dtype(np.float32 if np.dtype(dtype) in (np.float32, np.complex64) else np.float64)
+        self.batch_bytes = batch_bytes
+        self.reset()
+
+    def __repr__(self):
+        shape = None if self.power_sum is None else self.power_sum.shape
+        return f"<TFRAccumulator | {self.n_trials} trials, {len(self.freqs)} freqs, sums of shape {shape}>"
+
+    def reset(self):
+        """Forget all trials."""
+        self.n_trials = 0
+        self.n_times = None
+        self.power_sum = None
+        self.phase_sum = None
+        return self
+
+    def update(self, data):
+        """
+        Add trials to the running sums.
+
+        Parameters:
+        - data (numpy.ndarray): One trial (channels x times) or a batch of trials
+          (trials x channels x times).
+
+        Returns:
+        - TFRAccumulator: self, for chaining.
+        """
+        data = np.asarray(data)
+        if data.ndim == 2:
+            data = data[np.newaxis]
+        n_trials, n_channels, n_times = data.shape
+        if self.power_sum is None:
+            n_out = len(range(0, n_times, self.decim))
+            self.n_times = n_times
+            self.power_sum = np.zeros((n_channels, len(self.freqs), n_out), dtype=self.dtype)
+            self.phase_sum = np.zeros(self.power_sum.shape, dtype=np.result_type(self.dtype, np.complex64))
+        elif (n_channels, n_times) != (self.power_sum.shape[0], self.n_times):
+            raise ValueError(f"Expected trials of {self.power_sum.shape[0]} channels x {self.n_times} samples, "
+                             f"got {n_channels} x {n_times}.")
+
+        per_trial = self.phase_sum.nbytes
+        step = max(1, int(self.batch_bytes // per_trial))
+        for start in range(0, n_trials, step):
+            coefs = tfr_morlet(data[start:start + step], self.freqs, self.sfreq, n_cycles=self.n_cycles,
+                               output="complex", decim=self.decim, dtype=self.dtype)
+            magnitude = np.abs(coefs)
+            self.power_sum += 2 * np.square(magnitude).sum(axis=0)
+            # Unit phase vectors; zero coefficients (flat signals) contribute nothing
+            np.divide(coefs, magnitude, out=coefs, where=magnitude > 0)
+            coefs[magnitude == 0] = 0
+            self.phase_sum += coefs.sum(axis=0)
+        self.n_trials += n_trials
+        return self
+
+    def update_epochs(self, epochs):
+        """
+        Add all epochs of an mne.Epochs or EpochView, batch by batch.
+
+        Non-preloaded mne.Epochs are read one epoch at a time.
+
+        Returns:
+        - TFRAccumulator: self, for chaining.
+        """
+        from signalfloweeg.preprocessing.epoching import EpochView
+
+        if isinstance(epochs, EpochView):
+            step = max(1, int(self.batch_bytes // (len(epochs.ch_names) * len(self.freqs) * epochs.n_times * 16)))
+            for start in range(0, len(epochs), step):
+                self.update(epochs[start:start + step].data)
+        elif isinstance(epochs, mne.BaseEpochs) and epochs.preload:
+            self.update(epochs._data)
+        else:
+            for epoch in epochs:
+                self.update(epoch)
+        return self
+
+    def merge(self, other):
+        """
+        Add the sums of another accumulator with the same settings, e.g. from another worker.
+
+        Returns:
+        - TFRAccumulator: self, for chaining.
+        """
+        if other.power_sum is None:
+            return self
+        if self.power_sum is None:
+            self.n_times = other.n_times
+            self.power_sum = other.power_sum.copy()
+            self.phase_sum = other.phase_sum.copy()
+        else:
+            self.power_sum += other.power_sum
+            self.phase_sum += other.phase_sum
+        self.n_trials += other.n_trials
+        return self
+
+    @property
+    def times(self):
+        """Times of the accumulated samples in seconds."""
+        return self.tmin + np.arange(self.power_sum.shape[-1]) * self.decim / self.sfreq
+
+    def _check_trials(self):
+        if not self.n_trials:
+            raise RuntimeError("No trials have been accumulated.")
+
+    def power(self):
+        """
+        Return the trial-averaged power, channels x freqs x times.
+        """
+        self._check_trials()
+        return self.power_sum / self.n_trials
+
+    def itc(self):
+        """
+        Return the inter-trial coherence, channels x freqs x times.
+
+        The length of the mean unit phase vector: 1 for perfectly phase-locked
+        trials, near 0 for random phases.
+        """
+        self._check_trials()
+        return np.abs(self.phase_sum) / self.n_trials
+
+    def ersp(self, baseline=(None, 0), mode="db"):
+        """
+        Return the event-related spectral perturbation, channels x freqs x times.
+
+        Parameters:
+        - baseline (tuple): (start, stop) of the baseline in seconds, endpoints included; None for
+          either bound means the first or last sample. None returns the mean power.
+        - mode (str): "db" (10 * log10 of the ratio to the baseline mean, as in EEGLAB) or any
+          mode of mne.baseline.rescale ("mean", "ratio", "logratio", "percent", "zscore", ...).
+
+        Returns:
+        - numpy.ndarray: The baseline-normalized power.
+        """
+        from mne.baseline import rescale
 
-# Functions and classes
-def dummy_function():
-    pass
+        power = self.power()
+        if baseline is None:
+            return power
+        if mode == "db":
+            return 10 * rescale(power, self.times, baseline, mode="logratio", copy=False, verbose=False)
+        return rescale(power, self.times, baseline, mode=mode, copy=False, verbose=False)
 
 # Add your module-specific functions and classes here
@@ -6,5 +6,14 @@ Description: Module for handling input/output of data
 
 from .import_eeg import *
 from .validate_input import *
+from .memmap import *
+from .probe import *
+from .registry import *
+from .batch import *
+from .chunks import *
 
-__all__ = ['validate_mne_type', 'load_eeg', 'get_num_epochs', 'get_amplitude_statistics']
+__all__ = ['validate_mne_type', 'load_eeg', 'get_num_epochs', 'get_amplitude_statistics', 'ChannelStatistics',
+           'MappedRecording', 'memmap_eeglab', 'read_set_header', 'probe_header',
+           'register_reader', 'get_reader', 'get_recording_types', 'get_montage',
+           'load_eeg_many', 'estimate_recording_bytes',
+           'Chunk', 'iter_chunks', 'apply_chunked', 'open_recording', 'read_samples']
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Module: batch
+Description: Concurrent loading of many EEG recordings with bounded memory
+"""
+
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from signalfloweeg.utils.resources import available_memory, suggest_n_jobs
+
+from .import_eeg import load_eeg
+
+# Ratio of in-memory (float64) size to on-disk size per file format
+MEMORY_EXPANSION = {
+    '.set': 2,
+    '.fdt': 2,
+    '.fif': 2,
+    '.edf': 4,
+    '.bdf': 3,
+    '.mff': 2,
+    '.raw': 2,
+}
+
+
+def _disk_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    # Missing files are left for load_eeg to report
+    return os.path.getsize(path) if os.path.isfile(path) else 0
+
+
+def estimate_recording_bytes(file_path):
+    """
+    Estimate the memory needed to hold a loaded recording.
+
+    Parameters:
+    -----------
+    file_path : str
+        The path to the EEG data file. The .fdt file next to a .set file is
+        included in the estimate.
+
+    Returns:
+    --------
+    n_bytes : int
+        The estimated size of the loaded data in bytes.
+    """
+    ext = os.path.splitext(str(file_path).rstrip(os.sep))[1].lower()
+    n_bytes = _disk_size(file_path)
+    if ext == '.set':
+        fdt_path = os.path.splitext(file_path)[0] + '.fdt'
+        if os.path.isfile(fdt_path):
+            n_bytes += os.path.getsize(fdt_path)
+    return n_bytes * MEMORY_EXPANSION.get(ext, 2)
+
+
+def load_eeg_many(paths, recording_type, n_jobs=None, max_inflight_bytes=None):
+    """
+    Load many recordings concurrently in a process pool.
+
+    Recordings are yielded as soon as they are loaded, so the order follows
+    completion rather than ``paths``. New loads are only started while the
+    estimated size of the recordings being loaded stays below
+    ``max_inflight_bytes``; a recording larger than the budget is still loaded,
+    but on its own.
+
+    Parameters:
+    -----------
+    paths : iterable of str
+        The paths to the EEG data files.
+    recording_type : str
+        The recording type passed to load_eeg.
+    n_jobs : int, optional
+        Number of worker processes. Defaults to all available cores.
+    max_inflight_bytes : int, optional
+        Memory budget for recordings being loaded or waiting to be consumed.
+        Defaults to half of the currently available memory.
+
+    Yields:
+    -------
+    file_path, EEG : tuple
+        The path and the loaded MNE object, or None if loading failed.
+    """
+    pending = deque((path, estimate_recording_bytes(path)) for path in paths)
+    if not pending:
+        return
+
+    if max_inflight_bytes is None:
+        memory = available_memory()
+        max_inflight_bytes = memory // 2 if memory is not None else float("inf")
+    n_jobs = min(suggest_n_jobs(n_jobs), len(pending))
+
+    if n_jobs == 1:
+        for path, _ in pending:
+            try:
+                EEG = load_eeg(path, recording_type)
+            except Exception as e:
+                print(f"Failed to load {path}: {e}")
+                EEG = None
+            yield path, EEG
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        inflight = {}
+        inflight_bytes = 0
+        while pending or inflight:
+            while pending and len(inflight) < n_jobs and \
+                    (not inflight or inflight_bytes + pending[0][1] <= max_inflight_bytes):
+                path, n_bytes = pending.popleft()
+                inflight[pool.submit(load_eeg, path, recording_type)] = (path, n_bytes)
+                inflight_bytes += n_bytes
+
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, n_bytes = inflight.pop(future)
+                try:
+                    EEG = future.result()
+                except Exception as e:
+                    print(f"Failed to load {path}: {e}")
+                    EEG = None
+                yield path, EEG
+                inflight_bytes -= n_bytes
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Module: chunks
+Description: Streaming access to continuous recordings in bounded time windows
+"""
+
+import os
+from collections import namedtuple
+
+import mne
+import numpy as np
+
+from .import_eeg import load_eeg
+from .memmap import MappedRecording
+
+# Recording types assumed when iter_chunks is given a path without one
+DEFAULT_RECORDING_TYPES = {
+    '.set': "EEGLAB_RAW_SET",
+    '.fif': "MNE_FIF",
+    '.edf': "NEURONEXUS_30_EDF",
+    '.mff': "EGI_128_MFF",
+    '.raw': "EGI_128_RAW",
+}
+
+
+class Chunk(namedtuple("Chunk", ["data", "start", "stop", "core"])):
+    """
+    A window of a continuous recording.
+
+    ``data`` holds channels x samples including the requested overlap on both
+    sides (clipped at the recording edges). ``start`` and ``stop`` are the
+    recording samples covered by the non-overlapping core, and ``core`` is the
+    slice selecting that core from ``data``.
+    """
+    __slots__ = ()
+
+    @property
+    def core_data(self):
+        return self.data[..., self.core]
+
+
+def open_recording(raw_or_path, recording_type=None):
+    """
+    Open a recording for streaming without loading its samples.
+
+    Parameters:
+    -----------
+    raw_or_path : str, mne.io.BaseRaw, MappedRecording or numpy.ndarray
+        A file path, an MNE Raw object, a mapped recording or a channels x
+        samples array.
+    recording_type : str, optional
+        Recording type used when a path is given. Inferred from the file
+        extension if not provided.
+
+    Returns:
+    --------
+    recording : mne.io.BaseRaw, MappedRecording or numpy.ndarray
+    """
+    if isinstance(raw_or_path, (str, os.PathLike)):
+        if recording_type is None:
+            ext = os.path.splitext(str(raw_or_path).rstrip(os.sep))[1].lower()
+            recording_type = DEFAULT_RECORDING_TYPES.get(ext)
+        recording = load_eeg(str(raw_or_path), recording_type, lazy=True)
+        if recording is None:
+            raise ValueError(f"Could not open {raw_or_path} as '{recording_type}'.")
+        return recording
+
+    if isinstance(raw_or_path, mne.BaseEpochs) or \
+            (isinstance(raw_or_path, MappedRecording) and raw_or_path.is_epoched):
+        raise TypeError("Chunked iteration requires a continuous recording, not epochs.")
+    return raw_or_path
+
+
+def _n_times(recording):
+    return recording.shape[-1] if isinstance(recording, np.ndarray) else recording.n_times
+
+
+def read_samples(recording, picks=None, start=0, stop=None, dtype=np.float64):
+    """
+    Read channels x samples from an opened recording without loading the rest.
+    """
+    if isinstance(recording, np.ndarray):
+        rows = slice(None) if picks is None else picks
+        return np.asarray(recording[rows, start:stop], dtype=dtype)
+    if isinstance(recording, MappedRecording):
+        return recording.get_data(picks=picks, start=start, stop=stop, dtype=dtype)
+    return recording.get_data(picks=picks, start=start, stop=stop).astype(dtype, copy=False)
+
+
+def iter_chunks(raw_or_path, chunk_seconds=10.0, overlap_seconds=0.0, picks=None,
+                recording_type=None, sfreq=None, dtype=np.float64):
+    """
+    Iterate over a continuous recording in bounded time windows.
+
+    Only one window is held in memory at a time; MNE recordings opened
+    without preload and memory-mapped recordings are read from disk chunk by
+    chunk.
+
+    Parameters:
+    -----------
+    raw_or_path : str, mne.io.BaseRaw, MappedRecording or numpy.ndarray
+        The recording to iterate over.
+    chunk_seconds : float, optional
+        Length of the non-overlapping core of each chunk, in seconds.
+    overlap_seconds : float, optional
+        Context added on both sides of each core, in seconds. Use it for
+        filters and other operations that need neighbouring samples.
+    picks : list, optional
+        Channels to read. Defaults to all channels.
+    recording_type : str, optional
+        Recording type used when a path is given.
+    sfreq : float, optional
+        Sampling frequency, required when iterating over a numpy array.
+    dtype : numpy.dtype, optional
+        Dtype of the yielded data. Defaults to float64.
+
+    Yields:
+    -------
+    chunk : Chunk
+        The chunk data with its core sample range.
+    """
+    recording = open_recording(raw_or_path, recording_type)
+    if sfreq is None:
+        if isinstance(recording, np.ndarray):
+            raise ValueError("sfreq is required when iterating over a numpy array.")
+        sfreq = recording.info['sfreq']
+
+    n_times = _n_times(recording)
+    chunk_samples = max(1, int(round(chunk_seconds * sfreq)))
+    overlap_samples = max(0, int(round(overlap_seconds * sfreq)))
+
+    for start in range(0, n_times, chunk_samples):
+        stop = min(start + chunk_samples, n_times)
+        read_start = max(0, start - overlap_samples)
+        read_stop = min(n_times, stop + overlap_samples)
+        data = read_samples(recording, picks, read_start, read_stop, dtype=dtype)
+        yield Chunk(data, start, stop, slice(start - read_start, stop - read_start))
+
+
+def apply_chunked(func, raw_or_path, chunk_seconds=10.0, overlap_seconds=0.0, picks=None,
+                  recording_type=None, sfreq=None, dtype=np.float64, out=None):
+    """
+    Apply a function to a recording chunk by chunk and assemble the result.
+
+    ``func`` receives each chunk's data (with overlap) and must return an
+    array with the same number of samples; only the core of each result is
+    written to the output.
+
+    Parameters:
+    -----------
+    func : callable
+        Function mapping a channels x samples array to an array of the same
+        number of samples.
+    out : numpy.ndarray, optional
+        Output array of shape channels x samples (e.g. a numpy.memmap). A new
+        array is allocated if not given.
+
+    The other parameters are passed to iter_chunks.
+
+    Returns:
+    --------
+    out : numpy.ndarray
+        The assembled result.
+    """
+    recording = open_recording(raw_or_path, recording_type)
+    n_times = _n_times(recording)
+    for chunk in iter_chunks(recording, chunk_seconds, overlap_seconds, picks, sfreq=sfreq, dtype=dtype):
+        result = func(chunk.data)
+        if out is None:
+            out = np.empty(result.shape[:-1] + (n_times,), dtype=result.dtype)
+        out[..., chunk.start:chunk.stop] = result[..., chunk.core]
+    return out
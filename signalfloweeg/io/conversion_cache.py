@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Module: conversion_cache
+Description: On-disk cache of converted recordings keyed by content hash
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import mne
+import numpy as np
+
+from signalfloweeg.utils.cache import file_hash, get_cache_dir
+
+from .memmap import MappedRecording
+
+CACHE_FORMAT_VERSION = 1
+
+# Seconds of all channels read per block when converting a recording
+CACHE_CHUNK_SECONDS = 60.0
+
+
+def _source_files(file_path):
+    """Return the files whose contents define a recording."""
+    file_path = os.path.abspath(file_path)
+    if os.path.isdir(file_path):
+        return sorted(os.path.join(root, name)
+                      for root, _, names in os.walk(file_path) for name in names)
+    files = [file_path]
+    if file_path.lower().endswith(".set"):
+        fdt_path = os.path.splitext(file_path)[0] + ".fdt"
+        if os.path.isfile(fdt_path):
+            files.append(fdt_path)
+    return files
+
+
+def recording_hash(file_path, cache_dir):
+    """
+    Return the content hash of a recording, reusing it while the files are unchanged.
+
+    Hashes are remembered per path together with the size and modification
+    time of the source files, so unchanged recordings are not re-read.
+    """
+    files = _source_files(file_path)
+    stamp = [[os.path.getsize(f), os.stat(f).st_mtime_ns] for f in files]
+
+    path_key = hashlib.blake2b(os.path.abspath(file_path).encode(), digest_size=16).hexdigest()
+    index_path = os.path.join(get_cache_dir("paths", cache_dir), path_key + ".json")
+    if os.path.isfile(index_path):
+        with open(index_path, "r") as f:
+            entry = json.load(f)
+        if entry.get('stamp') == stamp:
+            return entry['hash']
+
+    content_hash = file_hash(*files)
+    _write_json(index_path, {'path': os.path.abspath(file_path), 'stamp': stamp, 'hash': content_hash})
+    return content_hash
+
+
+def _write_json(path, content):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
+
+def _write_entry(EEG, entry_dir, recording_type):
+    """Convert an MNE object to a float32, channel-major array plus metadata."""
+    is_epoched = isinstance(EEG, mne.BaseEpochs)
+    n_channels = len(EEG.ch_names)
+    n_times = len(EEG.times)
+
+    meta = {
+        'version': CACHE_FORMAT_VERSION,
+        'recording_type': recording_type,
+        'is_epoched': is_epoched,
+        'tmin': float(EEG.times[0]),
+    }
+
+    if is_epoched:
+        # Stored as channels x epochs x samples so each channel is contiguous
+        shape = (n_channels, len(EEG), n_times)
+        meta['event_id'] = EEG.event_id
+        np.save(os.path.join(entry_dir, "events.npy"), EEG.events)
+    else:
+        shape = (n_channels, n_times)
+        if len(EEG.annotations):
+            EEG.annotations.save(os.path.join(entry_dir, "annotations.fif"))
+
+    data = np.lib.format.open_memmap(os.path.join(entry_dir, "data.npy"), mode="w+",
+                                     dtype=np.float32, shape=shape)
+    # Read all channels of one time block at a time, so readers without preload
+    # go through the file once instead of once per channel
+    if is_epoched:
+        batch = max(1, int(CACHE_CHUNK_SECONDS * EEG.info['sfreq'] // n_times))
+        for start in range(0, shape[1], batch):
+            epochs = EEG[start:start + batch].get_data()
+            data[:, start:start + len(epochs)] = np.moveaxis(epochs, 1, 0)
+    else:
+        from .chunks import iter_chunks
+
+        for chunk in iter_chunks(EEG, CACHE_CHUNK_SECONDS, dtype=np.float32):
+            data[:, chunk.start:chunk.stop] = chunk.data
+    data.flush()
+    del data
+
+    mne.io.write_info(os.path.join(entry_dir, "info.fif"), EEG.info)
+    _write_json(os.path.join(entry_dir, "meta.json"), meta)
+
+
+def _open_entry(entry_dir, file_path):
+    """Open a cache entry as a memory-mapped recording."""
+    with open(os.path.join(entry_dir, "meta.json"), "r") as f:
+        meta = json.load(f)
+
+    data = np.load(os.path.join(entry_dir, "data.npy"), mmap_mode="r")
+    info = mne.io.read_info(os.path.join(entry_dir, "info.fif"), verbose=False)
+
+    events = event_id = annotations = None
+    if meta['is_epoched']:
+        data = np.moveaxis(data, 1, 0)
+        events = np.load(os.path.join(entry_dir, "events.npy"))
+        event_id = meta['event_id']
+    elif os.path.isfile(os.path.join(entry_dir, "annotations.fif")):
+        annotations = mne.read_annotations(os.path.join(entry_dir, "annotations.fif"))
+
+    return MappedRecording(data, info, tmin=meta['tmin'], file_path=file_path,
+                           annotations=annotations, events=events, event_id=event_id)
+
+
+def load_cached(file_path, recording_type, reader, cache_dir=None):
+    """
+    Load a recording through the conversion cache.
+
+    On a miss the recording is loaded with ``reader`` and converted once to a
+    float32, channel-major .npy array; on a hit the cached array is opened
+    memory-mapped without parsing the original file.
+
+    Parameters:
+    -----------
+    file_path : str
+        The path to the EEG data file.
+    recording_type : str
+        The recording type, which is part of the cache key.
+    reader : callable
+        Import function called as reader(file_path, recording_type) on a miss.
+    cache_dir : str, optional
+        Root cache directory. Defaults to utils.cache.get_cache_dir().
+
+    Returns:
+    --------
+    recording : MappedRecording or None
+        The cached recording, or None if the reader failed.
+    """
+    cache_root = get_cache_dir("recordings", cache_dir)
+    entry_dir = os.path.join(cache_root, recording_hash(file_path, cache_dir), recording_type)
+
+    if not os.path.isfile(os.path.join(entry_dir, "meta.json")):
+        EEG = reader(file_path, recording_type)
+        if EEG is None:
+            return None
+
+        # Write to a scratch directory first so concurrent loads never see partial entries
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(entry_dir))
+        try:
+            _write_entry(EEG, tmp_dir, recording_type)
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # Another process finished the same entry first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isfile(os.path.join(entry_dir, "meta.json")):
+                raise
+        print(f"Cached {recording_type} conversion of {file_path}")
+
+    return _open_entry(entry_dir, file_path)
@@ -1,15 +1,13 @@
 import mne
-import yaml
-import os
-
-
-import mne
-import yaml
-import os
 import numpy as np
 
+from .conversion_cache import load_cached
+from .memmap import memmap_eeglab
+from .probe import probe_header
+from .registry import get_montage, get_reader, get_recording_types, load_reader_plugins, register_reader
+
 
-def load_eeg(file_path=None, recording_type=None):
+def load_eeg(file_path=None, recording_type=None, lazy=False, cache_dir=None):
     """
     Load EEG data from various formats based on the specified recording type.
 
@@ -20,18 +18,23 @@ def load_eeg(file_path=None, recording_type=None):
     recording_type : str, optional
         The type of recording, which determines the import function to use.
         If not provided, the user will be prompted to choose from a list of available recording types.
+    lazy : bool, optional
+        If True, do not load the signal into memory. EEGLAB recordings with a
+        separate .fdt file are memory-mapped and returned as a MappedRecording;
+        other formats are opened with preload=False. Defaults to False.
+    cache_dir : str or bool, optional
+        Enables the conversion cache in this directory (True uses the default
+        cache location). The first load converts the recording to a float32
+        array keyed by its content hash; later loads memory-map that array and
+        return a MappedRecording without parsing the original file.
 
     Returns:
     --------
-    raw : mne.io.Raw or mne.Epochs
+    raw : mne.io.Raw, mne.Epochs or MappedRecording
         The loaded EEG data as an MNE Raw or Epochs object with the specified montage.
     """
-    # Load the YAML file with import specifications
-    import_specs_path = os.path.join(
-        os.path.dirname(os.path.dirname(__file__)), "config", "recording_types.yaml"
-    )
-    with open(import_specs_path, "r") as f:
-        import_specs = yaml.safe_load(f)
+    # Recording type specifications are parsed once and cached by the registry
+    import_specs = get_recording_types()
 
     # Display information on how to specify the recording type for the function with colors for better readability
     if file_path is None or recording_type is None:
@@ -39,38 +42,19 @@ def load_eeg(file_path=None, recording_type=None):
         display_info(import_specs)
         return None
 
-    # Find the appropriate import function based on the recording type
-    if recording_type in import_specs:
-        f"Valid specification found for recording type '{recording_type}'.",
-    else:
-        f"No import specification found for recording type '{recording_type}'.",
+    # Find the import function registered for the recording type
+    reader = get_reader(recording_type)
+    if reader is None:
+        print(f"No import function found for recording type '{recording_type}'.")
         display_info(import_specs)
         return None
     print(recording_type)
-    
-    # Add additional conditions for recording types here
-    # Call the appropriate import function
-    if recording_type == "EEGLAB_RAW_SET":
-        EEG = import_eeglab(file_path, recording_type)
-    elif recording_type == "EEGLAB_EPOCHS_SET":
-        EEG = import_eeglab(file_path, recording_type)
-    
-    elif recording_type == "MNE_FIF":
-        EEG = import_mne(file_path, recording_type)            
-    
-    elif recording_type == "EGI_128_RAW":
-        EEG = import_egi(file_path, recording_type)
-    elif recording_type == "EGI_128_MFF":
-        EEG = import_egi(file_path, recording_type)
-    
-    elif recording_type == "NEURONEXUS_30_EDF":
-        EEG = import_neuronexus(file_path, recording_type)
-        
-    # Add more import functions for other recording types
+
+    if cache_dir is None or cache_dir is False:
+        EEG = reader(file_path, recording_type, lazy=lazy)
     else:
-        print(f"No import function found for recording type '{recording_type}'.")
-        display_info(import_specs)
-        return None
+        EEG = load_cached(file_path, recording_type, reader,
+                          cache_dir=None if cache_dir is True else cache_dir)
 
     return EEG
 
@@ -92,14 +76,28 @@ def display_info(import_specs):
         "\033[1;35mPlease specify the recording type by passing it as the 'recording_type' argument.\n\033[0m"
     )
 
-def import_eeglab(file_path, recording_type):
+def import_eeglab(file_path, recording_type, lazy=False):
     """
     Import EEGLAB recording, apply montage, and perform epoching if necessary.
+
+    With lazy=True the .fdt payload is memory-mapped instead of read, so
+    channel and time slices are only loaded when accessed.
     """
+    if lazy:
+        EEG = memmap_eeglab(file_path)
+        if EEG is None:
+            print("Data is embedded in the .set file and cannot be memory-mapped, loading without preload...")
+        elif recording_type == "EEGLAB_RAW_SET" and EEG.is_epoched:
+            print("Error: The specified file contains epochs. Please use 'EEGLAB_EPOCHS_SET' as the recording type.")
+            return None
+        else:
+            print(f"Memory-mapped EEGLAB data from {EEG.file_path}")
+            return EEG
+
     if recording_type == "EEGLAB_RAW_SET":
         print("Importing EEGLAB RAW SET data...")
         try:
-            EEG = mne.io.read_raw_eeglab(file_path, preload=True)
+            EEG = mne.io.read_raw_eeglab(file_path, preload=not lazy)
         except TypeError:
             print("Error: The specified file contains epochs. Please use 'EEGLAB_EPOCHS_SET' as the recording type.")
             return None
@@ -110,28 +108,28 @@ def import_eeglab(file_path, recording_type):
 
     return EEG
 
-def import_mne(file_path, recording_type):
+def import_mne(file_path, recording_type, lazy=False):
     """
     Import MNE FIF recording, apply montage, and perform epoching if necessary.
     """
     if recording_type == "MNE_FIF":
         print("Importing MNE FIF data...")
-        EEG = mne.io.read_raw_fif(file_path, preload=True)
-        montage = mne.channels.make_standard_montage("GSN-HydroCel-129")
+        EEG = mne.io.read_raw_fif(file_path, preload=not lazy)
+        montage = get_montage("GSN-HydroCel-129")
         EEG.set_montage(montage, match_case=False)
 
     return EEG
 
-def import_egi(file_path, recording_type):
+def import_egi(file_path, recording_type, lazy=False):
     """
     Import EGI128 recording, apply montage, and perform epoching if necessary.
     """
 
-    if recording_type == "EGI_128_RAW":
+    if recording_type in ("EGI_128_RAW", "EGI_128_MFF"):
         print("Importing EGI 128 Channel RAW data...")
         # Implement the specific steps for importing EGI128 data
         raw = mne.io.read_raw_egi(input_fname=file_path, preload=False)
-        montage = mne.channels.make_standard_montage("GSN-HydroCel-129")
+        montage = get_montage("GSN-HydroCel-129")
         montage.ch_names[128] = "E129"
         raw.set_montage(montage, match_case=False)
 
@@ -141,7 +139,7 @@ def import_egi(file_path, recording_type):
             epochs = mne.io.read_epochs_eeglab(file_path)
         except Exception as e:
             print(f"Failed to read raw EEG data, will attempt import with Epochs: {e}")
-            raw = mne.io.read_raw_eeglab(file_path, preload=True)
+            raw = mne.io.read_raw_eeglab(file_path, preload=not lazy)
 
     # This code block is not used in the script. It shows how to load
     # continuous EEG data from a .set file with preload=True. Preloading
@@ -150,7 +148,7 @@ def import_egi(file_path, recording_type):
     return raw
 
 
-def import_neuronexus(file_path, recording_type):
+def import_neuronexus(file_path, recording_type, lazy=False):
     """
     Import neuronexus recording, apply montage, and perform epoching if necessary.
     """
@@ -158,7 +156,7 @@ def import_neuronexus(file_path, recording_type):
     if recording_type == "NEURONEXUS_30_EDF":
         # Add code to import the Neuronexus 30-channel Multielectrode Array
         # Return an MNE object with the correct channel montage and event markers
-        EEG = mne.io.read_raw_edf(file_path, preload=True)
+        EEG = mne.io.read_raw_edf(file_path, preload=not lazy)
 
     elif recording_type == "NEURONEXUS_30_XDF":
         # Add code to import the Neuronexus 30-channel Multielectrode Array
@@ -167,8 +165,30 @@ def import_neuronexus(file_path, recording_type):
    
     return EEG
 
+
+# Built-in readers; plugins register additional recording types the same way
+register_reader("EEGLAB_RAW_SET", import_eeglab)
+register_reader("EEGLAB_EPOCHS_SET", import_eeglab)
+register_reader("MNE_FIF", import_mne)
+register_reader("EGI_128_RAW", import_egi)
+register_reader("EGI_128_MFF", import_egi)
+register_reader("NEURONEXUS_30_EDF", import_neuronexus)
+load_reader_plugins()
+
 def get_num_epochs(file_path, recording_type):
-    EEG = load_eeg(file_path, recording_type)
+    # The file header is enough; only open the recording if it is ambiguous
+    header_info = probe_header(file_path)
+    if header_info is not None:
+        n_epochs = header_info['n_epochs']
+        n_times = header_info['total_samples'] // n_epochs
+        return {
+            'file_path': file_path,
+            # len() of an MNE object: epochs when epoched, samples when continuous
+            'num_epochs': n_epochs if header_info['mne_data_type'].startswith('epochs') else n_times,
+            'duration': (n_times - 1) / header_info['sample_rate']
+        }
+
+    EEG = load_eeg(file_path, recording_type, lazy=True)
     
     if EEG is not None:
         num_epochs = len(EEG)
@@ -183,30 +203,186 @@ def get_num_epochs(file_path, recording_type):
     else:
         return None
 
-def get_amplitude_statistics(file_path, recording_type):
-    EEG = load_eeg(file_path, recording_type)
+
+class ChannelStatistics:
+    """
+    Single-pass, per-channel amplitude statistics over blocks of samples.
+
+    Mean and variance are merged block by block with the parallel Welford
+    update, so each sample is visited once and blocks can be any size.
+    Percentiles are estimated from a systematic subsample taken every
+    ``stride`` samples.
+
+    Parameters:
+    -----------
+    n_channels : int
+        Number of channels in each block.
+    stride : int, optional
+        Keep every ``stride``-th sample for percentile estimation.
+    flat_threshold : float, optional
+        Consecutive samples differing by at most this amount count as flat.
+    """
+
+    def __init__(self, n_channels, stride=1, flat_threshold=1e-12):
+        self.n_samples = 0
+        self.mean = np.zeros(n_channels)
+        self.m2 = np.zeros(n_channels)
+        self.min = np.full(n_channels, np.inf)
+        self.max = np.full(n_channels, -np.inf)
+        self.n_at_min = np.zeros(n_channels, dtype=np.int64)
+        self.n_at_max = np.zeros(n_channels, dtype=np.int64)
+        self.n_flat = np.zeros(n_channels, dtype=np.int64)
+        self.stride = max(1, int(stride))
+        self.flat_threshold = flat_threshold
+        self._last = None
+        self._subsample = []
+
+    def update(self, block):
+        """
+        Add a channels x samples block.
+        """
+        n_block = block.shape[1]
+        if n_block == 0:
+            return
+
+        block_mean = block.mean(axis=1)
+        block_m2 = np.square(block - block_mean[:, None]).sum(axis=1)
+        n_total = self.n_samples + n_block
+        delta = block_mean - self.mean
+        self.mean += delta * (n_block / n_total)
+        self.m2 += block_m2 + np.square(delta) * (self.n_samples * n_block / n_total)
+
+        # Samples pinned at the channel extremes indicate amplifier clipping
+        block_min = block.min(axis=1)
+        block_max = block.max(axis=1)
+        n_block_min = np.count_nonzero(block == block_min[:, None], axis=1)
+        n_block_max = np.count_nonzero(block == block_max[:, None], axis=1)
+        self.n_at_min = np.where(block_min < self.min, n_block_min,
+                                 self.n_at_min + np.where(block_min == self.min, n_block_min, 0))
+        self.n_at_max = np.where(block_max > self.max, n_block_max,
+                                 self.n_at_max + np.where(block_max == self.max, n_block_max, 0))
+        self.min = np.minimum(self.min, block_min)
+        self.max = np.maximum(self.max, block_max)
+
+        steps = np.abs(np.diff(block, axis=1))
+        self.n_flat += np.count_nonzero(steps <= self.flat_threshold, axis=1)
+        if self._last is not None:
+            self.n_flat += np.abs(block[:, 0] - self._last) <= self.flat_threshold
+        self._last = block[:, -1].copy()
+
+        first = -self.n_samples % self.stride
+        self._subsample.append(block[:, first::self.stride].copy())
+        self.n_samples = n_total
+
+    def percentiles(self, q):
+        """
+        Estimate per-channel percentiles from the subsample.
+        """
+        return np.percentile(np.concatenate(self._subsample, axis=1), q, axis=1)
+
+    def result(self, percentiles=(1, 5, 50, 95, 99)):
+        """
+        Return the statistics as a dictionary of per-channel arrays.
+
+        'n_clipped' counts the repeats of the channel minimum and maximum:
+        samples at an extreme beyond the first one, so an unclipped channel
+        with a unique minimum and maximum scores 0.
+        """
+        variance = self.m2 / max(self.n_samples - 1, 1)
+        n_repeats_min = np.maximum(self.n_at_min - 1, 0)
+        n_repeats_max = np.maximum(self.n_at_max - 1, 0)
+        # A constant channel sits at both extremes at once; count its samples once
+        n_clipped = np.where(self.max > self.min, n_repeats_min + n_repeats_max, n_repeats_max)
+        result = {
+            'n_samples': np.full(self.mean.shape, self.n_samples),
+            'mean_amplitude': self.mean.copy(),
+            'max_amplitude': self.max.copy(),
+            'min_amplitude': self.min.copy(),
+            'amplitude_range': self.max - self.min,
+            'variance': variance,
+            'std_amplitude': np.sqrt(variance),
+            'n_flat': self.n_flat.copy(),
+            'n_clipped': n_clipped,
+        }
+        if percentiles:
+            for q, values in zip(percentiles, self.percentiles(percentiles)):
+                result[f'p{q:g}'] = values
+        return result
+
+
+def _iter_blocks(EEG, chunk_seconds):
+    """Yield channels x samples blocks of a continuous or epoched recording."""
+    from .chunks import iter_chunks
+
+    if isinstance(EEG, mne.BaseEpochs) or getattr(EEG, 'is_epoched', False):
+        n_epochs = len(EEG)
+        n_times = len(EEG.times)
+        batch = max(1, int(chunk_seconds * EEG.info['sfreq'] // n_times))
+        for start in range(0, n_epochs, batch):
+            if isinstance(EEG, mne.BaseEpochs):
+                epochs = EEG[start:start + batch].get_data()
+            else:
+                epochs = EEG.data[start:start + batch] * EEG.scale
+            yield np.concatenate(list(epochs), axis=1)
+    else:
+        for chunk in iter_chunks(EEG, chunk_seconds):
+            yield chunk.data
+
+
+def get_amplitude_statistics(file_path, recording_type, chunk_seconds=60.0,
+                             percentiles=(1, 5, 50, 95, 99), max_percentile_samples=100000,
+                             flat_threshold=1e-12):
+    """
+    Compute per-channel amplitude statistics in a single streaming pass.
+
+    The recording is opened lazily and read in chunks, so memory use is
+    bounded by the chunk size rather than the recording length.
+
+    Parameters:
+    -----------
+    file_path : str
+        The path to the EEG data file.
+    recording_type : str
+        The type of recording, passed to load_eeg.
+    chunk_seconds : float, optional
+        Amount of data read per pass step, in seconds.
+    percentiles : sequence of float, optional
+        Percentiles to estimate per channel.
+    max_percentile_samples : int, optional
+        Approximate number of samples per channel kept for percentile estimation.
+    flat_threshold : float, optional
+        Consecutive samples differing by at most this amount (in volts) count as flat.
+
+    Returns:
+    --------
+    result : dict or None
+        Per-channel table as a dictionary of equal-length lists (one row per
+        channel; pass to pandas.DataFrame), with 'file_path', 'channel',
+        'mean_amplitude', 'max_amplitude', 'min_amplitude', 'amplitude_range',
+        'variance', 'std_amplitude', one 'p<q>' column per percentile, 'n_flat'
+        (flat samples), 'n_clipped' (repeats of the channel minimum and maximum) and
+        'n_samples'.
+    """
+    EEG = load_eeg(file_path, recording_type, lazy=True)
     
     if EEG is not None:
-        data = EEG.get_data()  # This will be a 3D array of shape (epochs, channels, time points)
-        
-        # Compute statistics across all epochs and channels
-        mean_amplitude = np.mean(data)
-        max_amplitude = np.max(data)
-        min_amplitude = np.min(data)
-        amplitude_range = max_amplitude - min_amplitude
-    
+        n_total = len(EEG) * len(EEG.times) if isinstance(EEG, mne.BaseEpochs) or getattr(EEG, 'is_epoched', False) \
+            else len(EEG.times)
+        stats = ChannelStatistics(len(EEG.ch_names), stride=n_total // max(1, max_percentile_samples),
+                                  flat_threshold=flat_threshold)
+        for block in _iter_blocks(EEG, chunk_seconds):
+            stats.update(block)
+
+        channel_stats = stats.result(percentiles)
         result = {
-            'file_path': file_path,
-            'mean_amplitude': [mean_amplitude],
-            'max_amplitude': [max_amplitude],
-            'min_amplitude': [min_amplitude],
-            'amplitude_range': [amplitude_range]
+            'file_path': [file_path] * len(EEG.ch_names),
+            'channel': list(EEG.ch_names),
         }
+        result.update({key: values.tolist() for key, values in channel_stats.items()})
         return result
     else:
         return None
 
-
 if __name__ == "__main__":
 
     from signalfloweeg.utils import load_catalog
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Module: memmap
+Description: Memory-mapped, read-on-demand access to EEGLAB recordings
+"""
+
+import os
+
+import mne
+import numpy as np
+
+# Header fields needed to map an EEGLAB payload. Newer EEGLAB versions save
+# the EEG struct fields as top-level variables, which lets us skip the data.
+SET_HEADER_FIELDS = ["nbchan", "pnts", "trials", "srate", "xmin", "datfile", "chanlocs"]
+
+# EEGLAB stores samples in microvolts, MNE works in volts
+EEGLAB_SCALE = 1e-6
+
+
+def _list_variables(set_path):
+    """
+    List the top-level variables of a .set file as {name: (shape, MATLAB class)}.
+
+    Only the file's variable directory is read, never the variables themselves.
+    """
+    from scipy.io import whosmat
+    try:
+        return {name: (tuple(shape), cls) for name, shape, cls in whosmat(set_path)}
+    except NotImplementedError:
+        pass
+
+    # MATLAB v7.3 files are HDF5; datasets store their shape reversed
+    import h5py
+    variables = {}
+    with h5py.File(set_path, "r") as mat:
+        for name, item in mat.items():
+            cls = item.attrs.get("MATLAB_class", "")
+            cls = cls.decode() if isinstance(cls, bytes) else str(cls)
+            variables[name] = (tuple(getattr(item, "shape", ())[::-1]), cls)
+    return variables
+
+
+def _load_variables(set_path, variable_names):
+    try:
+        from scipy.io import loadmat
+        return loadmat(set_path, squeeze_me=True, struct_as_record=False, variable_names=variable_names)
+    except NotImplementedError:
+        from pymatreader import read_mat
+        return read_mat(set_path, variable_names=variable_names)
+
+
+def _load_set_struct(set_path):
+    """
+    Load the header fields of an EEGLAB .set file without the sample data.
+
+    Falls back to pymatreader for MATLAB v7.3 (HDF5) files, which scipy
+    cannot read.
+
+    Returns the header struct and the shape of the embedded data variable
+    (None when the data lives in a separate .fdt file), or (None, None) when
+    the header cannot be read without loading the samples.
+    """
+    variables = _list_variables(set_path)
+    if "nbchan" not in variables:
+        # Legacy files hold a single EEG struct that can only be loaded whole.
+        # That is cheap only when the samples are in a companion .fdt file.
+        if "EEG" not in variables or not os.path.isfile(os.path.splitext(set_path)[0] + ".fdt"):
+            return None, None
+        return _load_variables(set_path, ["EEG"])["EEG"], None
+
+    variable_names = [name for name in SET_HEADER_FIELDS if name in variables]
+    data_shape = None
+    if "data" in variables:
+        shape, cls = variables["data"]
+        if cls == "char":
+            # The name of the .fdt file
+            variable_names.append("data")
+        else:
+            data_shape = shape
+    return _load_variables(set_path, variable_names), data_shape
+
+
+def _get_field(struct, name, default=None):
+    if isinstance(struct, dict):
+        return struct.get(name, default)
+    return getattr(struct, name, default)
+
+
+def _get_channel_labels(chanlocs, n_channels):
+    """Return channel labels from an EEGLAB chanlocs struct array."""
+    labels = None
+    if isinstance(chanlocs, dict):
+        labels = chanlocs.get("labels")
+    elif chanlocs is not None:
+        chanlocs = np.atleast_1d(chanlocs)
+        if chanlocs.size and hasattr(chanlocs[0], "labels"):
+            labels = [loc.labels for loc in chanlocs]
+
+    if labels is None or isinstance(labels, str):
+        labels = [labels] if isinstance(labels, str) else []
+    labels = [str(label) for label in labels]
+
+    if len(labels) != n_channels:
+        labels = [f"EEG{idx:03d}" for idx in range(1, n_channels + 1)]
+    return labels
+
+
+def _get_data_file(set_path, data_field):
+    """
+    Resolve the .fdt file referenced by a .set header.
+
+    Mirrors MNE: the referenced file is looked up next to the .set file,
+    falling back to the .set basename with a .fdt extension.
+    """
+    if not isinstance(data_field, str):
+        return None
+
+    set_dir = os.path.dirname(os.path.abspath(set_path))
+    candidate = os.path.join(set_dir, os.path.basename(data_field))
+    if os.path.isfile(candidate) and not os.path.samefile(candidate, set_path):
+        return candidate
+
+    fdt_path = os.path.splitext(os.path.abspath(set_path))[0] + ".fdt"
+    if os.path.isfile(fdt_path):
+        return fdt_path
+    return None
+
+
+def read_set_header(set_path):
+    """
+    Read the header of an EEGLAB .set file without touching the sample data.
+
+    Parameters:
+    -----------
+    set_path : str
+        The path to the EEGLAB .set file.
+
+    Returns:
+    --------
+    header : dict or None
+        Dictionary with 'n_channels', 'n_times' (samples per epoch),
+        'n_trials', 'sfreq', 'tmin', 'ch_names' and 'data_file' (the path to
+        the .fdt payload, or None when the data is embedded in the .set file).
+        None when the header is ambiguous: a legacy single-struct file without
+        a companion .fdt file, or embedded data whose shape does not match.
+    """
+    eeg, data_shape = _load_set_struct(set_path)
+    if eeg is None:
+        return None
+
+    n_channels = int(_get_field(eeg, "nbchan", 1))
+    data_field = _get_field(eeg, "data")
+    data_file = _get_data_file(set_path, data_field)
+    if data_file is None:
+        data_file = _get_data_file(set_path, _get_field(eeg, "datfile"))
+
+    header = {
+        'n_channels': n_channels,
+        'n_times': int(_get_field(eeg, "pnts", 1)),
+        'n_trials': int(_get_field(eeg, "trials", 1)),
+        'sfreq': float(_get_field(eeg, "srate")),
+        'tmin': float(_get_field(eeg, "xmin", 0.0) or 0.0),
+        'ch_names': _get_channel_labels(_get_field(eeg, "chanlocs"), n_channels),
+        'data_file': data_file,
+    }
+    if data_file is None:
+        # Embedded samples must agree with the header, or the header cannot be trusted
+        expected = header['n_channels'] * header['n_times'] * header['n_trials']
+        if data_shape is None or int(np.prod(data_shape)) != expected or data_shape[0] != n_channels:
+            return None
+    return header
+
+
+class MappedRecording:
+    """
+    Read-on-demand view over a memory-mapped EEG recording.
+
+    ``data`` follows the MNE layout (channels x samples for continuous
+    recordings, epochs x channels x samples for epoched ones) but stays on
+    disk until it is sliced. ``get_data`` reads and scales only the
+    requested channels and samples, like ``mne.io.Raw.get_data``.
+
+    Parameters:
+    -----------
+    data : numpy.ndarray or numpy.memmap
+        The unscaled sample array in MNE layout.
+    info : mne.Info
+        Measurement info describing the channels of ``data``.
+    scale : float, optional
+        Factor converting stored samples to volts.
+    tmin : float, optional
+        Time of the first sample of each epoch, in seconds.
+    file_path : str, optional
+        The recording this view was created from.
+    loader : callable, optional
+        Zero-argument callable returning the fully loaded MNE object.
+    annotations : mne.Annotations, optional
+        Annotations of a continuous recording, used by to_mne.
+    events, event_id : optional
+        Events and event IDs of an epoched recording, used by to_mne.
+    """
+
+    def __init__(self, data, info, scale=1.0, tmin=0.0, file_path=None, loader=None,
+                 annotations=None, events=None, event_id=None):
+        self.data = data
+        self.info = info
+        self.scale = scale
+        self.tmin = tmin
+        self.file_path = file_path
+        self._loader = loader
+        self.annotations = annotations
+        self.events = events
+        self.event_id = event_id
+
+    def __repr__(self):
+        kind = "epochs" if self.is_epoched else "raw"
+        return (f"<MappedRecording | {kind}, {len(self.ch_names)} channels, "
+                f"{self.n_times} samples, {self.sfreq:g} Hz>")
+
+    def __len__(self):
+        # Match MNE: samples for continuous data, epochs for epoched data
+        return self.data.shape[0] if self.is_epoched else self.n_times
+
+    @property
+    def is_epoched(self):
+        return self.data.ndim == 3
+
+    @property
+    def ch_names(self):
+        return self.info['ch_names']
+
+    @property
+    def sfreq(self):
+        return self.info['sfreq']
+
+    @property
+    def n_times(self):
+        return self.data.shape[-1]
+
+    @property
+    def times(self):
+        return self.tmin + np.arange(self.n_times) / self.sfreq
+
+    def _pick_indices(self, picks):
+        if picks is None:
+            return slice(None)
+        if isinstance(picks, slice):
+            return picks
+        picks = [picks] if isinstance(picks, (str, int, np.integer)) else list(picks)
+        return [self.ch_names.index(pick) if isinstance(pick, str) else int(pick)
+                for pick in picks]
+
+    def get_data(self, picks=None, start=0, stop=None, dtype=np.float64):
+        """
+        Read a block of samples from disk.
+
+        Parameters:
+        -----------
+        picks : str, int, list or slice, optional
+            Channel names or indices to read. Defaults to all channels.
+        start, stop : int, optional
+            Sample range to read (within each epoch for epoched data).
+        dtype : numpy.dtype, optional
+            Output dtype. Defaults to float64.
+
+        Returns:
+        --------
+        data : numpy.ndarray
+            The scaled samples, in volts.
+        """
+        block = self.data[..., self._pick_indices(picks), start:stop]
+        return np.multiply(block, self.scale, dtype=dtype)
+
+    def to_mne(self):
+        """
+        Materialize the recording as an MNE Raw or Epochs object.
+        """
+        if self._loader is not None:
+            return self._loader()
+        if self.is_epoched:
+            return mne.EpochsArray(self.get_data(), self.info, events=self.events,
+                                   tmin=self.tmin, event_id=self.event_id)
+        raw = mne.io.RawArray(self.get_data(), self.info)
+        if self.annotations is not None:
+            raw.set_annotations(self.annotations)
+        return raw
+
+
+def memmap_eeglab(set_path):
+    """
+    Memory-map the float32 .fdt payload of an EEGLAB recording.
+
+    Parameters:
+    -----------
+    set_path : str
+        The path to the EEGLAB .set file.
+
+    Returns:
+    --------
+    recording : MappedRecording or None
+        A read-on-demand view of the recording, or None when the samples are
+        embedded in the .set file (or the header is ambiguous) and cannot be
+        mapped. The embedded samples are not read in that case.
+    """
+    header = read_set_header(set_path)
+    if header is None or header['data_file'] is None:
+        return None
+    data_file = header['data_file']
+
+    n_channels, n_times, n_trials = header['n_channels'], header['n_times'], header['n_trials']
+    expected_bytes = 4 * n_channels * n_times * n_trials
+    if os.path.getsize(data_file) != expected_bytes:
+        raise ValueError(
+            f"{data_file} holds {os.path.getsize(data_file)} bytes, expected "
+            f"{expected_bytes} for {n_channels} channels x {n_times} samples x {n_trials} trials."
+        )
+
+    # EEGLAB writes channels x samples x trials in column-major order
+    if n_trials == 1:
+        data = np.memmap(data_file, dtype="<f4", mode="r", shape=(n_channels, n_times), order="F")
+        loader = lambda: mne.io.read_raw_eeglab(set_path, preload=True)
+    else:
+        data = np.memmap(data_file, dtype="<f4", mode="r", shape=(n_channels, n_times, n_trials), order="F")
+        data = np.moveaxis(data, 2, 0)
+        loader = lambda: mne.io.read_epochs_eeglab(set_path)
+
+    info = mne.create_info(header['ch_names'], header['sfreq'], ch_types="eeg")
+    return MappedRecording(data, info, scale=EEGLAB_SCALE, tmin=header['tmin'],
+                           file_path=set_path, loader=loader)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Module: probe
+Description: Header-only metadata probes for EEG recordings
+"""
+
+import os
+
+import mne
+import numpy as np
+
+from .memmap import read_set_header
+
+
+def _probe_set(file_path):
+    header = read_set_header(file_path)
+    if header is None:
+        return None
+
+    # The payload must exist and match the header, otherwise the header
+    # alone cannot be trusted
+    data_file = header['data_file']
+    if data_file is not None:
+        expected_bytes = 4 * header['n_channels'] * header['n_times'] * header['n_trials']
+        if os.path.getsize(data_file) != expected_bytes:
+            return None
+
+    n_epochs = header['n_trials']
+    return {
+        'mne_data_type': 'raw_eeglab' if n_epochs == 1 else 'epochs_eeglab',
+        'n_channels': header['n_channels'],
+        'sample_rate': header['sfreq'],
+        'n_epochs': n_epochs,
+        'total_samples': n_epochs * header['n_times'],
+    }
+
+
+def _probe_mne(file_path, read_raw, data_type):
+    # Without preload these readers only parse the file header
+    raw = read_raw(file_path, preload=False, verbose=False)
+    return {
+        'mne_data_type': data_type,
+        'n_channels': len(raw.info['ch_names']),
+        'sample_rate': float(raw.info['sfreq']),
+        'n_epochs': 1,
+        'total_samples': int(raw.n_times),
+    }
+
+
+def _probe_fif(file_path):
+    if not str(file_path).endswith(("-epo.fif", "_epo.fif")):
+        return _probe_mne(file_path, mne.io.read_raw_fif, 'raw_fif')
+
+    epochs = mne.read_epochs(file_path, preload=False, verbose=False)
+    return {
+        'mne_data_type': 'epochs_fif',
+        'n_channels': len(epochs.info['ch_names']),
+        'sample_rate': float(epochs.info['sfreq']),
+        'n_epochs': len(epochs),
+        'total_samples': len(epochs) * len(epochs.times),
+    }
+
+
+HEADER_PROBES = {
+    '.set': _probe_set,
+    '.fif': _probe_fif,
+    '.edf': lambda file_path: _probe_mne(file_path, mne.io.read_raw_edf, 'raw_edf'),
+    '.bdf': lambda file_path: _probe_mne(file_path, mne.io.read_raw_bdf, 'raw_bdf'),
+    '.mff': lambda file_path: _probe_mne(file_path, mne.io.read_raw_egi, 'raw_egi'),
+    '.raw': lambda file_path: _probe_mne(file_path, mne.io.read_raw_egi, 'raw_egi'),
+}
+
+
+def probe_header(file_path):
+    """
+    Read core recording metadata from the file header only.
+
+    Supports EEGLAB .set (parsed directly from the MATLAB struct), FIF, EDF,
+    BDF and EGI files. The sample payload is never read.
+
+    Parameters:
+    -----------
+    file_path : str
+        The path to the EEG file.
+
+    Returns:
+    --------
+    header_info : dict or None
+        Dictionary with 'mne_data_type', 'n_channels', 'sample_rate',
+        'n_epochs' and 'total_samples', or None when the format is not
+        supported or the header is ambiguous and a full load is required.
+    """
+    probe = HEADER_PROBES.get(os.path.splitext(str(file_path).rstrip(os.sep))[1].lower())
+    if probe is None:
+        return None
+
+    try:
+        header_info = probe(file_path)
+    except Exception as e:
+        print(f"Header probe failed for {file_path}: {e}")
+        return None
+
+    if header_info is None:
+        return None
+    if header_info['n_channels'] < 1 or header_info['total_samples'] < 1 \
+            or not np.isfinite(header_info['sample_rate']) or header_info['sample_rate'] <= 0:
+        return None
+    return header_info
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Module: registry
+Description: Registry of EEG readers keyed by recording type
+"""
+
+import os
+from functools import lru_cache
+from importlib.metadata import entry_points
+
+import mne
+import yaml
+
+RECORDING_TYPES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "config", "recording_types.yaml"
+)
+
+# Entry point group third-party packages use to register readers, e.g. in setup.py:
+#   entry_points={"signalfloweeg.readers": ["NEURONEXUS_30_XDF = mypkg.xdf:import_xdf"]}
+READER_ENTRY_POINT_GROUP = "signalfloweeg.readers"
+
+_READERS = {}
+
+
+@lru_cache(maxsize=None)
+def load_recording_types(specs_path=RECORDING_TYPES_PATH):
+    """
+    Parse the recording type specifications once and cache the result.
+
+    Parameters:
+    -----------
+    specs_path : str, optional
+        Path to the YAML file with the recording type specifications.
+
+    Returns:
+    --------
+    import_specs : dict
+        Mapping of recording type to its 'montage' and 'description'.
+        The cached dictionary is shared and should not be modified.
+    """
+    with open(specs_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+@lru_cache(maxsize=None)
+def _make_standard_montage(name):
+    return mne.channels.make_standard_montage(name)
+
+
+def get_montage(name):
+    """
+    Return a standard MNE montage, constructing it only on first use.
+
+    A copy of the cached montage is returned so callers can rename channels
+    without affecting later calls.
+    """
+    return _make_standard_montage(name).copy()
+
+
+def register_reader(recording_type, reader=None, montage=None, description=None):
+    """
+    Register an import function for a recording type.
+
+    Can be called directly or used as a decorator::
+
+        @register_reader("NEURONEXUS_30_XDF", description="Neuronexus XDF")
+        def import_xdf(file_path, recording_type, lazy=False):
+            ...
+
+    Parameters:
+    -----------
+    recording_type : str
+        The recording type passed to load_eeg.
+    reader : callable, optional
+        Function called as reader(file_path, recording_type, lazy=lazy).
+    montage : str, optional
+        Montage specification. Defaults to the one in recording_types.yaml.
+    description : str, optional
+        Description shown by load_eeg. Defaults to the one in recording_types.yaml.
+    """
+    def decorator(func):
+        spec = load_recording_types().get(recording_type, {})
+        _READERS[recording_type] = {
+            'reader': func,
+            'montage': montage if montage is not None else spec.get("montage"),
+            'description': description if description is not None else spec.get("description", ""),
+        }
+        return func
+
+    if reader is None:
+        return decorator
+    return decorator(reader)
+
+
+def get_reader(recording_type):
+    """
+    Return the import function registered for a recording type, or None.
+    """
+    entry = _READERS.get(recording_type)
+    return entry['reader'] if entry is not None else None
+
+
+def get_recording_types():
+    """
+    Return the specifications of all recording types, including plugin readers.
+    """
+    import_specs = dict(load_recording_types())
+    for rec_type, entry in _READERS.items():
+        if rec_type not in import_specs:
+            import_specs[rec_type] = {'montage': entry['montage'], 'description': entry['description']}
+    return import_specs
+
+
+def load_reader_plugins():
+    """
+    Register readers exposed through the 'signalfloweeg.readers' entry point group.
+
+    Each entry point name is a recording type and its value the import function.
+    """
+    try:
+        plugins = entry_points(group=READER_ENTRY_POINT_GROUP)
+    except TypeError:  # Python < 3.10
+        plugins = entry_points().get(READER_ENTRY_POINT_GROUP, [])
+
+    for plugin in plugins:
+        try:
+            register_reader(plugin.name, plugin.load())
+        except Exception as e:
+            print(f"Failed to load reader plugin '{plugin.name}': {e}")
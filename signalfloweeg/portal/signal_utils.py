@@ -1,9 +1,13 @@
 import mne
+from signalfloweeg.io.probe import probe_header
 
 def get_core_eeg_info( set_file_path ):
     """
     Extracts metadata from an EEG file.
 
+    The file header is probed first; the recording is only loaded with MNE
+    when the header is missing or ambiguous.
+
     Args:
         set_file_path (str): The path to the EEG file.
 
@@ -11,6 +15,10 @@ def get_core_eeg_info( set_file_path ):
         dict: A dictionary containing the metadata of the EEG file.
     """
 
+    header_info = probe_header(set_file_path)
+    if header_info is not None:
+        return {'mne_load_error': False, **header_info}
+
     try:
         # Load the EEG data using MNE
         try:
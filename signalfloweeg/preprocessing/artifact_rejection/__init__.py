@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+Module: artifact_rejection
+Description: Artifact rejection steps for epoched and continuous EEG
+"""
+
+from .autoreject import *
+from .ica import *
+
+__all__ = ['run_autoreject', 'run_autoreject_raw', 'fit_autoreject', 'fit_ica', 'apply_ica', 'run_ica']
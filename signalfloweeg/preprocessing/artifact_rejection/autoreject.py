@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Module: autoreject
+Description: Autoreject epoch rejection with cached thresholds and adaptive n_jobs
+"""
+
+# Imports
+import os
+
+import numpy as np
+import mne
+
+from signalfloweeg.utils.cache import array_hash, get_cache_dir
+from signalfloweeg.utils.resources import suggest_n_jobs
+
+# Peak memory of an autoreject worker relative to the epochs it is fitted on
+AUTOREJECT_MEMORY_FACTOR = 3
+
+
+def autoreject_key(epochs, **params):
+    """
+    Returns the cache key of an AutoReject fit on the given epochs.
+
+    The key covers the epoch data, channel names, sampling rate and the
+    fitting parameters, so any change to the recording or settings refits.
+    """
+    return array_hash(epochs.get_data(), ch_names=epochs.ch_names,
+                      sfreq=epochs.info['sfreq'], **params)
+
+
+def fit_autoreject(epochs, n_interpolate=(1, 2, 3, 4), consensus=None, n_fit_epochs=None,
+                   random_state=11, n_jobs=None, cache=True, cache_dir=None, verbose=True):
+    """
+    Fit AutoReject, reusing a previous fit of the same data and settings.
+
+    Parameters:
+    -----------
+    epochs : mne.Epochs
+        The epochs to learn the rejection thresholds from.
+    n_interpolate : tuple, optional
+        Candidate numbers of channels to interpolate.
+    consensus : array-like, optional
+        Candidate consensus fractions. Defaults to autoreject's grid.
+    n_fit_epochs : int or float, optional
+        Fit on a random subset of this many epochs (or this fraction of
+        epochs if below 1). Defaults to all epochs.
+    random_state : int, optional
+        Seed for the subset and for autoreject's cross-validation.
+    n_jobs : int, optional
+        Number of workers. Defaults to as many as fit in cores and memory.
+    cache : bool, optional
+        Whether to load and save fitted thresholds. Defaults to True.
+    cache_dir : str, optional
+        Root cache directory. Defaults to utils.cache.get_cache_dir().
+    verbose : bool, optional
+        Verbosity passed to autoreject.
+
+    Returns:
+    --------
+    ar : autoreject.AutoReject
+        The fitted AutoReject object.
+    """
+    import autoreject
+
+    epochs.load_data()
+    params = {
+        'n_interpolate': list(n_interpolate),
+        'consensus': None if consensus is None else list(consensus),
+        'n_fit_epochs': n_fit_epochs,
+        'random_state': random_state,
+    }
+
+    cache_file = None
+    if cache:
+        key = autoreject_key(epochs, **params)
+        cache_file = os.path.join(get_cache_dir("autoreject", cache_dir), f"{key}-ar.hdf5")
+        if os.path.isfile(cache_file):
+            print(f"Loaded autoreject thresholds from {cache_file}")
+            return autoreject.read_auto_reject(cache_file)
+
+    fit_epochs = epochs
+    if n_fit_epochs is not None:
+        n_fit = int(round(n_fit_epochs * len(epochs))) if n_fit_epochs < 1 else int(n_fit_epochs)
+        if n_fit < len(epochs):
+            rng = np.random.default_rng(random_state)
+            fit_epochs = epochs[np.sort(rng.choice(len(epochs), size=n_fit, replace=False))]
+            print(f"Fitting autoreject on {n_fit} of {len(epochs)} epochs")
+
+    n_bytes = 8 * len(fit_epochs) * len(epochs.ch_names) * len(epochs.times) * AUTOREJECT_MEMORY_FACTOR
+    n_jobs = min(suggest_n_jobs(n_jobs, bytes_per_job=n_bytes), len(epochs.ch_names))
+
+    ar = autoreject.AutoReject(n_interpolate=np.asarray(n_interpolate), consensus=consensus,
+                               random_state=random_state, n_jobs=n_jobs, verbose=verbose)
+    ar.fit(fit_epochs)
+
+    if cache_file is not None:
+        ar.save(cache_file, overwrite=True)
+    return ar
+
+
+def run_autoreject(epochs, n_interpolate=(1, 2, 3, 4), n_fit_epochs=None, n_jobs=None,
+                   cache=True, cache_dir=None, **kwargs):
+    """
+    Clean epochs with AutoReject.
+
+    Thresholds are fitted with fit_autoreject (optionally on a subset of the
+    epochs, and reused from the cache on reruns) and applied to all epochs.
+
+    Parameters:
+    -----------
+    epochs : mne.Epochs
+        The epochs to clean.
+
+    The other parameters are passed to fit_autoreject.
+
+    Returns:
+    --------
+    epochs_ar : mne.Epochs
+        The cleaned epochs.
+    reject_log : autoreject.RejectLog
+        The rejection log over all epochs.
+    """
+    ar = fit_autoreject(epochs, n_interpolate=n_interpolate, n_fit_epochs=n_fit_epochs,
+                        n_jobs=n_jobs, cache=cache, cache_dir=cache_dir, **kwargs)
+    epochs_ar, reject_log = ar.transform(epochs, return_log=True)
+    return epochs_ar, reject_log
+
+
+def run_autoreject_raw(raw, epochs_func=None, epoch_duration=1.0, **kwargs):
+    """
+    Epoch a continuous recording and clean it with AutoReject.
+
+    Parameters:
+    -----------
+    raw : mne.io.Raw
+        The continuous recording.
+    epochs_func : callable, optional
+        Function mapping raw to mne.Epochs, e.g. a paradigm-specific epoching
+        step. Defaults to fixed-length epochs of ``epoch_duration`` seconds.
+    epoch_duration : float, optional
+        Length of the fixed-length epochs in seconds.
+
+    The other parameters are passed to run_autoreject.
+
+    Returns:
+    --------
+    epochs_ar : mne.Epochs
+        The cleaned epochs.
+    reject_log : autoreject.RejectLog
+        The rejection log over all epochs.
+    """
+    if epochs_func is not None:
+        epochs = epochs_func(raw)
+    else:
+        epochs = mne.make_fixed_length_epochs(raw, duration=epoch_duration, preload=True)
+    return run_autoreject(epochs, **kwargs)
@@ -1,15 +1,189 @@
 # -*- coding: utf-8 -*-
 """
 Module: ica
-Description: [Insert module description here]
+Description: ICA artifact rejection with cached decompositions and chunked removal
 """
 
 # Imports
+import os
+from contextlib import nullcontext
+
 import numpy as np
 import mne
 
-# Functions and classes
-def dummy_function():
-    pass
+from signalfloweeg.decomposition.ica import apply_operator, ica_operator
+from signalfloweeg.denoising.buffers import output_raw
+from signalfloweeg.io.chunks import iter_chunks
+from signalfloweeg.utils.cache import array_hash, get_cache_dir
+
+# Sampling rate the fitting copy is decimated towards
+ICA_FIT_SFREQ = 200.0
+
+
+def _blas_limits(n_threads):
+    """Limit BLAS/OpenMP threads while fitting, if threadpoolctl is available."""
+    if n_threads is None:
+        return nullcontext()
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        print("threadpoolctl is not installed; BLAS threads are not limited")
+        return nullcontext()
+    return threadpool_limits(limits=n_threads)
+
+
+def _resolve_method(method, fit_params):
+    """Fall back to extended Infomax when python-picard is not installed."""
+    if method == "picard":
+        try:
+            import picard  # noqa: F401
+        except ImportError:
+            print("python-picard is not installed, using extended Infomax instead")
+            return "infomax", dict(extended=True, **(fit_params or {}))
+    return method, fit_params
+
+
+def ica_key(raw, **params):
+    """
+    Returns the cache key of an ICA fit on a recording.
+
+    The key covers the samples, channel names, bad channels, sampling rate
+    and fitting parameters.
+    """
+    data = raw._data if raw.preload else raw.get_data()
+    return array_hash(data, ch_names=raw.ch_names, bads=raw.info['bads'],
+                      sfreq=raw.info['sfreq'], **params)
+
+
+def fit_ica(raw, n_components=50, method="picard", l_freq=1.0, fit_sfreq=ICA_FIT_SFREQ,
+            random_state=97, fit_params=None, n_threads=None, cache=True, cache_dir=None):
+    """
+    Fit ICA on a high-passed, decimated copy of a recording, reusing earlier fits.
+
+    Parameters:
+    -----------
+    raw : mne.io.Raw
+        The continuous recording. It is not modified.
+    n_components : int or float, optional
+        Number of ICA components (or explained variance), as in mne ICA.
+    method : str, optional
+        "picard", "infomax" or "fastica". Picard falls back to extended
+        Infomax when python-picard is not installed.
+    l_freq : float, optional
+        High-pass edge of the fitting copy in Hz. None skips the high-pass.
+    fit_sfreq : float, optional
+        Approximate sampling rate used for fitting; the copy is decimated by
+        the largest integer factor that stays at or above it.
+    random_state : int, optional
+        Seed for the ICA.
+    fit_params : dict, optional
+        Extra parameters for the ICA algorithm.
+    n_threads : int, optional
+        Limit on BLAS threads while fitting, e.g. to run several fits side by
+        side. Defaults to no limit.
+    cache : bool, optional
+        Whether to load and save fitted decompositions. Defaults to True.
+    cache_dir : str, optional
+        Root cache directory. Defaults to utils.cache.get_cache_dir().
+
+    Returns:
+    --------
+    ica : mne.preprocessing.ICA
+        The fitted ICA.
+    """
+    from signalfloweeg.preprocessing.filtering import filter_raw
+
+    method, fit_params = _resolve_method(method, fit_params)
+    decim = max(1, int(raw.info['sfreq'] // fit_sfreq)) if fit_sfreq else 1
+    params = {
+        'n_components': n_components,
+        'method': method,
+        'l_freq': l_freq,
+        'decim': decim,
+        'random_state': random_state,
+        'fit_params': fit_params,
+    }
+
+    cache_file = None
+    if cache:
+        cache_file = os.path.join(get_cache_dir("ica", cache_dir), f"{ica_key(raw, **params)}-ica.fif")
+        if os.path.isfile(cache_file):
+            print(f"Loaded ICA decomposition from {cache_file}")
+            return mne.preprocessing.read_ica(cache_file, verbose=False)
+
+    raw_fit = filter_raw(raw, l_freq, None) if l_freq is not None else raw
+    ica = mne.preprocessing.ICA(n_components=n_components, method=method, fit_params=fit_params,
+                                random_state=random_state, verbose=False)
+    with _blas_limits(n_threads):
+        ica.fit(raw_fit, decim=decim, verbose=False)
+
+    if cache_file is not None:
+        ica.save(cache_file, overwrite=True, verbose=False)
+    return ica
+
+
+def apply_ica(raw, ica, exclude=None, chunk_seconds=60, copy=True, out=None, dtype=None):
+    """
+    Remove ICA components from a recording, one matrix multiply per chunk.
+
+    Equivalent to ica.apply(raw.copy(), exclude=exclude).
+
+    Parameters:
+    -----------
+    raw : mne.io.Raw
+        The continuous recording. Non-preloaded data is read chunk by chunk.
+    ica : mne.preprocessing.ICA
+        A fitted ICA.
+    exclude : list of int, optional
+        Components to remove. Defaults to ica.exclude.
+    chunk_seconds : float, optional
+        Length of each chunk in seconds.
+    copy : bool, optional
+        If False, clean the samples of raw in place. Defaults to True.
+    out : numpy.ndarray, optional
+        Preallocated channels x samples array to hold the result.
+    dtype : numpy.dtype, optional
+        Dtype of the result, e.g. np.float32. Defaults to the input dtype.
+
+    Returns:
+    --------
+    raw_clean : mne.io.Raw
+        The cleaned recording.
+    """
+    ch_names, M, offset = ica_operator(ica, exclude=exclude)
+    picks = [raw.ch_names.index(name) for name in ch_names]
+
+    raw_clean = output_raw(raw, copy=copy, out=out, dtype=dtype)
+    dtype = raw_clean._data.dtype
+    for chunk in iter_chunks(raw, chunk_seconds=chunk_seconds, dtype=dtype):
+        data = chunk.data
+        data[picks] = apply_operator(data[picks], M, offset)
+        raw_clean._data[:, chunk.start:chunk.stop] = data
+    return raw_clean
+
+
+def run_ica(raw, exclude, n_components=50, method="picard", **kwargs):
+    """
+    Fit (or load) ICA for a recording and remove the given components.
+
+    Parameters:
+    -----------
+    raw : mne.io.Raw
+        The continuous recording.
+    exclude : list of int
+        Components to remove.
+
+    The other parameters are passed to fit_ica.
+
+    Returns:
+    --------
+    raw_clean : mne.io.Raw
+        The cleaned recording.
+    ica : mne.preprocessing.ICA
+        The fitted ICA, with ica.exclude set.
+    """
+    ica = fit_ica(raw, n_components=n_components, method=method, **kwargs)
+    ica.exclude = list(exclude)
+    return apply_ica(raw, ica), ica
 
 # Add your module-specific functions and classes here
@@ -1,15 +1,289 @@
 # -*- coding: utf-8 -*-
 """
 Module: epoching
-Description: [Insert module description here]
+Description: Zero-copy fixed-length and event-locked epochs over continuous buffers
 """
 
 # Imports
 import numpy as np
 import mne
+from numpy.lib.stride_tricks import sliding_window_view
 
-# Functions and classes
-def dummy_function():
-    pass
+from signalfloweeg.io.memmap import MappedRecording
+
+# Epochs copied at a time when materializing, to bound temporary memory
+MATERIALIZE_BATCH = 256
+
+
+def _continuous_buffer(raw_or_data, sfreq=None):
+    """
+    Return (buffer, scale, info, first_samp) for a continuous recording.
+
+    The buffer is the recording's own channels x samples array, never a copy.
+    """
+    if isinstance(raw_or_data, np.ndarray):
+        if sfreq is None:
+            raise ValueError("sfreq is required when epoching a numpy array.")
+        info = mne.create_info(len(raw_or_data), sfreq, ch_types="eeg")
+        return raw_or_data, 1.0, info, 0
+    if isinstance(raw_or_data, MappedRecording):
+        if raw_or_data.is_epoched:
+            raise TypeError("Epoching requires a continuous recording, not epochs.")
+        return raw_or_data.data, raw_or_data.scale, raw_or_data.info, 0
+    if isinstance(raw_or_data, mne.BaseEpochs):
+        raise TypeError("Epoching requires a continuous recording, not epochs.")
+    if not raw_or_data.preload:
+        raw_or_data.load_data()
+    return raw_or_data._data, 1.0, raw_or_data.info, raw_or_data.first_samp
+
+
+class EpochView:
+    """
+    Epochs defined as windows over a continuous channels x samples buffer.
+
+    Selecting or truncating epochs only changes the window start samples; no
+    data is copied until materialize() (or data, for irregularly spaced
+    epochs) is called. Regularly spaced epochs are exposed as a zero-copy
+    strided view of shape epochs x channels x samples.
+
+    Parameters:
+    -----------
+    buffer : numpy.ndarray
+        The continuous channels x samples data (e.g. raw._data or a memmap).
+    starts : array-like of int
+        First buffer sample of each epoch.
+    n_times : int
+        Samples per epoch.
+    info : mne.Info
+        Measurement info of the buffer's channels.
+    tmin : float, optional
+        Time of the first sample of each epoch relative to its event, in seconds.
+    scale : float, optional
+        Factor applied to the buffer values when materializing.
+    events : numpy.ndarray, optional
+        MNE events array, one row per epoch.
+    event_id : dict, optional
+        Mapping from event names to event codes.
+    """
+
+    def __init__(self, buffer, starts, n_times, info, tmin=0.0, scale=1.0, events=None, event_id=None):
+        self.buffer = buffer
+        self.starts = np.asarray(starts, dtype=int)
+        self.n_times = int(n_times)
+        self.info = info
+        self.tmin = tmin
+        self.scale = scale
+        self.events = events
+        self.event_id = event_id
+        self._windows = sliding_window_view(buffer, self.n_times, axis=-1)
+
+    def __repr__(self):
+        kind = "strided view" if self.is_view else "lazy"
+        return (f"<EpochView | {len(self)} epochs, {len(self.ch_names)} channels, "
+                f"{self.n_times} samples, {kind}>")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, item):
+        """Select epochs by index, slice or boolean mask without copying data."""
+        if isinstance(item, (int, np.integer)):
+            item = [item]
+        events = None if self.events is None else self.events[item]
+        return EpochView(self.buffer, self.starts[item], self.n_times, self.info, tmin=self.tmin,
+                         scale=self.scale, events=events, event_id=self.event_id)
+
+    def truncate(self, n_epochs):
+        """Keep only the first n_epochs epochs, without copying data."""
+        return self[:n_epochs]
+
+    @property
+    def ch_names(self):
+        return self.info['ch_names']
+
+    @property
+    def sfreq(self):
+        return self.info['sfreq']
+
+    @property
+    def times(self):
+        return self.tmin + np.arange(self.n_times) / self.sfreq
+
+    @property
+    def _step(self):
+        if len(self.starts) < 2:
+            return 1
+        steps = np.diff(self.starts)
+        return int(steps[0]) if steps[0] > 0 and np.all(steps == steps[0]) else None
+
+    @property
+    def is_view(self):
+        """Whether data is a zero-copy view (regularly spaced epochs, no scaling)."""
+        return self._step is not None and self.scale == 1.0
+
+    @property
+    def data(self):
+        """
+        The epochs as an epochs x channels x samples array.
+
+        A read-only strided view of the buffer when the epochs are regularly
+        spaced; otherwise the epochs are copied.
+        """
+        if self.is_view:
+            if not len(self):
+                return self._windows[:, :0].transpose(1, 0, 2)
+            stop = self.starts[-1] + 1
+            return self._windows[:, self.starts[0]:stop:self._step].transpose(1, 0, 2)
+        return self.materialize()[0]
+
+    def _batch(self, starts, dtype):
+        block = self._windows[:, starts].transpose(1, 0, 2)
+        return np.multiply(block, self.scale, dtype=dtype)
+
+    def materialize(self, baseline=None, reject=None, flat=None, dtype=np.float64):
+        """
+        Copy the epochs into a new array, applying baseline correction and rejection.
+
+        Epochs are processed in batches, and rejected epochs are never copied
+        into the output.
+
+        Parameters:
+        -----------
+        baseline : tuple, optional
+            (start, stop) of the baseline in seconds, relative to the epoch
+            times; None for either bound means the epoch start or end.
+        reject : float, optional
+            Drop epochs whose peak-to-peak amplitude exceeds this value on any channel.
+        flat : float, optional
+            Drop epochs whose peak-to-peak amplitude is below this value on any channel.
+        dtype : numpy.dtype, optional
+            Output dtype. Defaults to float64.
+
+        Returns:
+        --------
+        data : numpy.ndarray
+            The kept epochs, epochs x channels x samples.
+        kept : numpy.ndarray
+            Indices of the kept epochs.
+        """
+        if reject is None and flat is None:
+            kept = np.arange(len(self))
+        else:
+            keep = np.ones(len(self), dtype=bool)
+            for start in range(0, len(self), MATERIALIZE_BATCH):
+                batch = self._batch(self.starts[start:start + MATERIALIZE_BATCH], dtype)
+                ptp = np.ptp(batch, axis=-1)
+                if reject is not None:
+                    keep[start:start + len(batch)] &= np.all(ptp <= reject, axis=-1)
+                if flat is not None:
+                    keep[start:start + len(batch)] &= np.all(ptp >= flat, axis=-1)
+            kept = np.flatnonzero(keep)
+
+        baseline_slice = None
+        if baseline is not None:
+            times = self.times
+            b_start = times[0] if baseline[0] is None else baseline[0]
+            b_stop = times[-1] if baseline[1] is None else baseline[1]
+            idx = np.flatnonzero((times >= b_start) & (times <= b_stop))
+            baseline_slice = slice(idx[0], idx[-1] + 1)
+
+        data = np.empty((len(kept), len(self.ch_names), self.n_times), dtype=dtype)
+        for start in range(0, len(kept), MATERIALIZE_BATCH):
+            stop = min(start + MATERIALIZE_BATCH, len(kept))
+            data[start:stop] = self._batch(self.starts[kept[start:stop]], dtype)
+            if baseline_slice is not None:
+                data[start:stop] -= data[start:stop, :, baseline_slice].mean(axis=-1, keepdims=True)
+        return data, kept
+
+    def to_mne(self, baseline=None, reject=None, flat=None):
+        """
+        Materialize the epochs as an mne.EpochsArray.
+
+        Parameters are passed to materialize().
+        """
+        data, kept = self.materialize(baseline=baseline, reject=reject, flat=flat)
+        events = None if self.events is None else self.events[kept]
+        return mne.EpochsArray(data, self.info, events=events, tmin=self.tmin,
+                               event_id=self.event_id, baseline=baseline, verbose=False)
+
+
+def fixed_length_epochs(raw_or_data, duration, overlap=0.0, max_epochs=None, sfreq=None):
+    """
+    Split a continuous recording into fixed-length epochs without copying it.
+
+    Parameters:
+    -----------
+    raw_or_data : mne.io.Raw, MappedRecording or numpy.ndarray
+        The continuous recording. Non-preloaded MNE recordings are loaded.
+    duration : float
+        Epoch length in seconds.
+    overlap : float, optional
+        Overlap between consecutive epochs in seconds.
+    max_epochs : int, optional
+        Keep only the first max_epochs epochs.
+    sfreq : float, optional
+        Sampling frequency, required for numpy arrays.
+
+    Returns:
+    --------
+    epochs : EpochView
+        Zero-copy epochs, events coded 1 as in mne.make_fixed_length_epochs.
+    """
+    buffer, scale, info, first_samp = _continuous_buffer(raw_or_data, sfreq)
+    n_times = int(round(duration * info['sfreq']))
+    step = n_times - int(round(overlap * info['sfreq']))
+    if step <= 0:
+        raise ValueError("overlap must be shorter than duration.")
+
+    starts = np.arange(0, buffer.shape[-1] - n_times + 1, step)[:max_epochs]
+    events = np.column_stack([starts + first_samp, np.zeros_like(starts), np.ones_like(starts)])
+    return EpochView(buffer, starts, n_times, info, scale=scale, events=events, event_id={'1': 1})
+
+
+def event_locked_epochs(raw_or_data, events, tmin, tmax, event_id=None, max_epochs=None, sfreq=None):
+    """
+    Cut epochs around events as windows over the continuous buffer.
+
+    Epochs that would extend past the recording are dropped, as in mne.Epochs.
+
+    Parameters:
+    -----------
+    raw_or_data : mne.io.Raw, MappedRecording or numpy.ndarray
+        The continuous recording. Non-preloaded MNE recordings are loaded.
+    events : numpy.ndarray
+        MNE events array; sample indices include the recording's first_samp.
+    tmin, tmax : float
+        Epoch start and end relative to each event, in seconds (inclusive).
+    event_id : dict or int, optional
+        Events to keep. Defaults to all event codes.
+    max_epochs : int, optional
+        Keep only the first max_epochs epochs.
+    sfreq : float, optional
+        Sampling frequency, required for numpy arrays.
+
+    Returns:
+    --------
+    epochs : EpochView
+        The epochs, selected and truncated without copying data.
+    """
+    buffer, scale, info, first_samp = _continuous_buffer(raw_or_data, sfreq)
+    sfreq = info['sfreq']
+    events = np.asarray(events)
+
+    if event_id is None:
+        event_id = {str(code): int(code) for code in np.unique(events[:, 2])}
+    elif isinstance(event_id, (int, np.integer)):
+        event_id = {str(event_id): int(event_id)}
+    events = events[np.isin(events[:, 2], list(event_id.values()))]
+
+    start_offset = int(round(tmin * sfreq))
+    n_times = int(round(tmax * sfreq)) - start_offset + 1
+    starts = events[:, 0] - first_samp + start_offset
+    in_bounds = (starts >= 0) & (starts + n_times <= buffer.shape[-1])
+
+    events = events[in_bounds][:max_epochs]
+    starts = starts[in_bounds][:max_epochs]
+    return EpochView(buffer, starts, n_times, info, tmin=start_offset / sfreq, scale=scale,
+                     events=events, event_id=event_id)
 
 # Add your module-specific functions and classes here
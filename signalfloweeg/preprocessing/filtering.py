@@ -1,26 +1,214 @@
 # -*- coding: utf-8 -*-
 """
 Module: filtering
-Description: [Insert module description here]
+Description: Batched FIR/IIR filtering of continuous EEG with cached filter designs
 """
 
 # Imports
+from functools import lru_cache
+
 import numpy as np
 import mne
+from scipy import signal
+
+from signalfloweeg.denoising.buffers import output_raw
+from signalfloweeg.io.chunks import iter_chunks
+
+# Relative amplitude below which an IIR impulse response counts as decayed
+IIR_DECAY_THRESHOLD = 1e-7
+
+
+@lru_cache(maxsize=64)
+def _design_fir(sfreq, l_freq, h_freq, l_trans_bandwidth, h_trans_bandwidth, filter_length, fir_window):
+    h = mne.filter.create_filter(None, sfreq, l_freq, h_freq, filter_length=filter_length,
+                                 l_trans_bandwidth=l_trans_bandwidth, h_trans_bandwidth=h_trans_bandwidth,
+                                 method='fir', phase='zero', fir_window=fir_window, fir_design='firwin',
+                                 verbose=False)
+    h.setflags(write=False)
+    return h
+
+
+def design_fir(sfreq, l_freq, h_freq, l_trans_bandwidth="auto", h_trans_bandwidth="auto",
+               filter_length="auto", fir_window="hamming"):
+    """
+    Design a zero-phase FIR filter, reusing earlier designs with the same parameters.
+
+    The design matches mne.filter.create_filter (firwin design), so results
+    agree with raw.filter(l_freq, h_freq, fir_design='firwin').
+
+    Parameters:
+    - sfreq (float): Sampling frequency in Hz.
+    - l_freq (float): Lower pass-band edge in Hz, or None for a low-pass filter.
+    - h_freq (float): Upper pass-band edge in Hz, or None for a high-pass filter.
+    - l_trans_bandwidth, h_trans_bandwidth (float or str): Transition bandwidths in Hz. Default is "auto".
+    - filter_length (int or str): Filter length in samples or as a duration. Default is "auto".
+    - fir_window (str): Window used in the design. Default is "hamming".
+
+    Returns:
+    - h (numpy.ndarray): Read-only, odd-length symmetric filter coefficients.
+    """
+    l_freq = None if l_freq is None else float(l_freq)
+    h_freq = None if h_freq is None else float(h_freq)
+    return _design_fir(float(sfreq), l_freq, h_freq, l_trans_bandwidth, h_trans_bandwidth,
+                       filter_length, fir_window)
+
+
+@lru_cache(maxsize=64)
+def _design_iir(sfreq, l_freq, h_freq, order, ftype):
+    if l_freq is not None and h_freq is not None:
+        btype, freqs = ("bandpass", [l_freq, h_freq]) if l_freq < h_freq else ("bandstop", [h_freq, l_freq])
+    elif l_freq is not None:
+        btype, freqs = "highpass", l_freq
+    else:
+        btype, freqs = "lowpass", h_freq
+    sos = signal.iirfilter(order, freqs, btype=btype, ftype=ftype, fs=sfreq, output="sos")
+
+    # Length after which the impulse response has decayed, used as chunk overlap
+    impulse = np.zeros(int(60 * sfreq))
+    impulse[0] = 1
+    response = np.abs(signal.sosfilt(sos, impulse))
+    above = np.flatnonzero(response > IIR_DECAY_THRESHOLD * response.max())
+    # MNE's own ringing estimate, which it uses as edge padding
+    padlen = mne.filter.estimate_ringing_samples(sos)
+    sos.setflags(write=False)
+    return sos, int(above[-1]) + 1, padlen
+
+
+def design_iir(sfreq, l_freq, h_freq, order=4, ftype="butter"):
+    """
+    Design an IIR filter in second-order sections, reusing earlier designs.
+
+    Parameters:
+    - sfreq (float): Sampling frequency in Hz.
+    - l_freq (float): Lower edge in Hz, or None for a low-pass filter.
+    - h_freq (float): Upper edge in Hz, or None for a high-pass filter.
+      A band-stop filter is designed when l_freq > h_freq, as in MNE.
+    - order (int): Filter order, applied forward and backward. Default is 4.
+    - ftype (str): IIR family passed to scipy.signal.iirfilter. Default is "butter".
+
+    Returns:
+    - sos (numpy.ndarray): Read-only second-order sections.
+    """
+    l_freq = None if l_freq is None else float(l_freq)
+    h_freq = None if h_freq is None else float(h_freq)
+    return _design_iir(float(sfreq), l_freq, h_freq, int(order), ftype)[0]
+
+
+def filter_length(sfreq, low_freq, high_freq, method="fir", **design_kwargs):
+    """
+    Return the number of neighbouring samples that influence each filtered sample.
+
+    Chunked filtering uses it as the overlap between chunks.
+    """
+    if method == "fir":
+        return len(design_fir(sfreq, low_freq, high_freq, **design_kwargs))
+    return _iir_lengths(sfreq, low_freq, high_freq, **design_kwargs)[0]
 
-def filter_data(data, low_freq, high_freq):
+
+def _iir_lengths(sfreq, low_freq, high_freq, order=4, ftype="butter"):
+    """Return (decay length, MNE edge padding) of an IIR design, in samples."""
+    l_freq = None if low_freq is None else float(low_freq)
+    h_freq = None if high_freq is None else float(high_freq)
+    return _design_iir(float(sfreq), l_freq, h_freq, int(order), ftype)[1:]
+
+
+def filter_data(data, low_freq, high_freq, sfreq, method="fir", dtype=None, out=None, **design_kwargs):
     """
-    Filter the input data using a bandpass filter.
+    Filter the input data using a band-pass, high-pass, low-pass or band-stop filter.
+
+    All channels are filtered as one 2-D batch. FIR filters are applied
+    zero-phase with overlap-add FFT convolution; IIR filters are applied
+    forward and backward (sosfiltfilt) after the same edge padding as
+    mne.filter.filter_data, so edge samples match MNE too.
 
     Parameters:
-    - data (numpy.ndarray): Input data array.
-    - low_freq (float): Lower frequency bound of the bandpass filter.
-    - high_freq (float): Upper frequency bound of the bandpass filter.
+    - data (numpy.ndarray): Input data array, channels x samples (or 1-D).
+    - low_freq (float): Lower frequency bound of the filter, or None for a low-pass filter.
+    - high_freq (float): Upper frequency bound of the filter, or None for a high-pass filter.
+    - sfreq (float): Sampling frequency in Hz.
+    - method (str): "fir" or "iir". Default is "fir".
+    - dtype (numpy.dtype): Computation and output dtype, e.g. np.float32. Default is float64.
+    - out (numpy.ndarray): Array to write the result into. May be data itself.
+    - **design_kwargs: Passed to design_fir or design_iir.
 
     Returns:
     - numpy.ndarray: Filtered data array.
     """
-    # Function implementation goes here
-    pass
+    dtype = np.dtype(dtype if dtype is not None else (out.dtype if out is not None else np.float64))
+    x = np.asarray(data, dtype=dtype)
+    n_times = x.shape[-1]
+
+    if method == "fir":
+        h = design_fir(sfreq, low_freq, high_freq, **design_kwargs).astype(dtype, copy=False)
+        # Odd reflection at the edges, as MNE's default "reflect_limited" padding
+        n_edge = min(len(h), n_times) - 1
+        x_ext = np.pad(x, [(0, 0)] * (x.ndim - 1) + [(n_edge, n_edge)], mode="reflect", reflect_type="odd")
+        y = signal.oaconvolve(x_ext, h.reshape((1,) * (x.ndim - 1) + (-1,)), mode="full", axes=-1)
+        start = n_edge + (len(h) - 1) // 2
+        y = y[..., start:start + n_times]
+    elif method == "iir":
+        sos = design_iir(sfreq, low_freq, high_freq, **design_kwargs)
+        # Odd reflection by MNE's ringing estimate, as mne.filter.filter_data pads IIR filters
+        padlen = min(_iir_lengths(sfreq, low_freq, high_freq, **design_kwargs)[1], n_times - 1)
+        x_ext = np.pad(x, [(0, 0)] * (x.ndim - 1) + [(padlen, padlen)], mode="reflect", reflect_type="odd")
+        y = signal.sosfiltfilt(sos.astype(dtype), x_ext, axis=-1, padlen=0)[..., padlen:padlen + n_times]
+    else:
+        raise ValueError(f"Unknown filter method '{method}', expected 'fir' or 'iir'.")
+
+    if out is None:
+        return y.astype(dtype, copy=False)
+    out[...] = y
+    return out
+
+
+def filter_raw(raw, low_freq, high_freq, method="fir", chunk_seconds=60, copy=True, out=None,
+               dtype=None, **design_kwargs):
+    """
+    Filter a continuous recording chunk by chunk.
+
+    Each chunk is read with enough overlap for the filter to see the same
+    neighbouring samples as when filtering the whole recording, so FIR results
+    match filtering at once (IIR results to within the impulse-response
+    decay). Non-preloaded recordings are read from disk one chunk at a time.
+
+    Parameters:
+    - raw (mne.io.Raw): Raw EEG data object.
+    - low_freq (float): Lower frequency bound, or None for a low-pass filter.
+    - high_freq (float): Upper frequency bound, or None for a high-pass filter.
+    - method (str): "fir" or "iir". Default is "fir".
+    - chunk_seconds (float): Length of each chunk in seconds. Default is 60 seconds.
+    - copy (bool): If False, filter the samples of raw in place. Default is True.
+    - out (numpy.ndarray): Preallocated channels x samples array to hold the result.
+    - dtype (numpy.dtype): Dtype of the result and of the computation, e.g. np.float32.
+    - **design_kwargs: Passed to design_fir or design_iir.
+
+    Returns:
+    - raw_filtered (mne.io.Raw): The filtered Raw EEG data object.
+    """
+    sfreq = raw.info['sfreq']
+    overlap = filter_length(sfreq, low_freq, high_freq, method=method, **design_kwargs)
+    chunk_seconds = max(chunk_seconds, 2 * overlap / sfreq)
+
+    raw_filtered = output_raw(raw, copy=copy, out=out, dtype=dtype)
+    dtype = raw_filtered._data.dtype
+
+    # A chunk is written only after the next one is read, so filtering in place
+    # never feeds already-filtered samples into the next chunk's overlap
+    pending = None
+    for chunk in iter_chunks(raw, chunk_seconds=chunk_seconds, overlap_seconds=overlap / sfreq, dtype=dtype):
+        filtered = filter_data(chunk.data, low_freq, high_freq, sfreq, method=method, dtype=dtype,
+                               **design_kwargs)
+        if pending is not None:
+            raw_filtered._data[:, pending[0].start:pending[0].stop] = pending[1]
+        pending = (chunk, filtered[:, chunk.core])
+    if pending is not None:
+        raw_filtered._data[:, pending[0].start:pending[0].stop] = pending[1]
+
+    lowpass = raw_filtered.info['lowpass'] if high_freq is None else min(high_freq, raw_filtered.info['lowpass'])
+    highpass = raw_filtered.info['highpass'] if low_freq is None else max(low_freq, raw_filtered.info['highpass'])
+    if low_freq is None or high_freq is None or low_freq < high_freq:
+        with raw_filtered.info._unlock():
+            raw_filtered.info['lowpass'], raw_filtered.info['highpass'] = float(lowpass), float(highpass)
+    return raw_filtered
 
 # Add your module-specific functions and classes here
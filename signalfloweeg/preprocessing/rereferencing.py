@@ -1,15 +1,163 @@
 # -*- coding: utf-8 -*-
 """
 Module: rereferencing
-Description: [Insert module description here]
+Description: Chunked EEG re-referencing with average, median, channel and REST references
 """
 
 # Imports
+import os
 import numpy as np
 import mne
+from mne.io.constants import FIFF
 
-# Functions and classes
-def dummy_function():
-    pass
+from signalfloweeg.denoising.buffers import output_raw
+from signalfloweeg.io.chunks import iter_chunks
+from signalfloweeg.utils.cache import array_hash, get_cache_dir
+
+# References applied as a per-sample subtraction
+SUBTRACTIVE_REFERENCES = ("average", "median")
+
+# REST transforms computed or loaded in this session, by cache key
+_REST_TRANSFORMS = {}
+
+
+def reference_data(data, ref="average", ref_picks=None, out=None):
+    """
+    Subtract a reference signal from channels x samples data.
+
+    The reference is one value per sample, broadcast over channels, so the
+    cost is linear in the data size. Pass ``out=data`` to re-reference in place.
+
+    Parameters:
+    - data (numpy.ndarray): Input data array, channels x samples.
+    - ref (str or list): "average", "median", or a list of channel indices whose
+      mean is the reference (e.g. linked mastoids).
+    - ref_picks (array-like): Channels the average or median is taken over.
+      Default uses all channels.
+    - out (numpy.ndarray): Array to write the result into. May be data itself.
+
+    Returns:
+    - numpy.ndarray: The re-referenced data.
+    """
+    source = data if ref_picks is None else data[ref_picks]
+    if isinstance(ref, str):
+        if ref == "average":
+            reference = source.mean(axis=0)
+        elif ref == "median":
+            reference = np.median(source, axis=0)
+        else:
+            raise ValueError(f"Unknown reference '{ref}', expected 'average', 'median' or channel indices.")
+    else:
+        reference = data[list(ref)].mean(axis=0)
+    return np.subtract(data, reference, out=out)
+
+
+def _forward_leadfield(info):
+    """Lead field of a spherical head model with a dipole grid, for REST."""
+    sphere = mne.make_sphere_model("auto", "auto", info, verbose=False)
+    src = mne.setup_volume_source_space(sphere=sphere, exclude=30., pos=15., verbose=False)
+    forward = mne.make_forward_solution(info, trans=None, src=src, bem=sphere, verbose=False)
+    return forward["sol"]["data"]
+
+
+def rest_transform(info, forward=None, cache_dir=None):
+    """
+    Return the REST transform for a montage, computing it once per montage.
+
+    The Reference Electrode Standardization Technique maps average-referenced
+    data to a reference at infinity: T = G (H G)^+ H, with G the lead field
+    and H the average-reference operator. Transforms are cached in memory and
+    on disk, keyed by the channel positions (or the given forward solution).
+
+    Parameters:
+    - info (mne.Info): Measurement info with EEG channel positions.
+    - forward (mne.Forward): Forward solution for the EEG channels. Default uses
+      a spherical head model with a volume dipole grid, as suggested by MNE.
+    - cache_dir (str): Root cache directory. Defaults to utils.cache.get_cache_dir().
+
+    Returns:
+    - numpy.ndarray: Read-only channels x channels transform.
+    """
+    eeg_info = mne.pick_info(info, mne.pick_types(info, eeg=True, exclude=[]))
+    positions = np.array([ch["loc"][:3] for ch in eeg_info["chs"]])
+    if forward is None:
+        key = array_hash(positions, kind="sphere-volume-15mm")
+    else:
+        forward = mne.pick_channels_forward(forward, eeg_info["ch_names"], ordered=True, verbose=False)
+        key = array_hash(positions, forward["sol"]["data"], kind="forward")
+
+    if key in _REST_TRANSFORMS:
+        return _REST_TRANSFORMS[key]
+
+    path = os.path.join(get_cache_dir("rest", cache_dir), f"{key}.npy")
+    if os.path.isfile(path):
+        transform = np.load(path)
+    else:
+        G = _forward_leadfield(eeg_info) if forward is None else forward["sol"]["data"]
+        n_channels = len(G)
+        H = np.eye(n_channels) - 1. / n_channels
+        transform = G @ np.linalg.pinv(H @ G) @ H
+        np.save(path, transform)
+        print(f"Cached REST transform for {n_channels} channels")
+
+    transform.setflags(write=False)
+    _REST_TRANSFORMS[key] = transform
+    return transform
+
+
+def rereference_raw(raw, ref="average", forward=None, chunk_seconds=60, copy=True, out=None, dtype=None,
+                    cache_dir=None):
+    """
+    Re-reference the EEG channels of a continuous recording chunk by chunk.
+
+    Average, median and channel references are applied as in-place
+    subtractions of one reference sample per time point. REST multiplies
+    each chunk by the cached transform. Only good EEG channels are used and
+    re-referenced, as in MNE.
+
+    Parameters:
+    - raw (mne.io.Raw): Raw EEG data object. Non-preloaded data is read chunk by chunk.
+    - ref (str or list): "average", "median", "REST", or reference channel names
+      (e.g. ["M1", "M2"] for linked mastoids).
+    - forward (mne.Forward): Forward solution used by REST. Default uses a spherical head model.
+    - chunk_seconds (float): Length of each chunk in seconds. Default is 60 seconds.
+    - copy (bool): If False, re-reference the samples of raw in place. Default is True.
+    - out (numpy.ndarray): Preallocated channels x samples array to hold the result.
+    - dtype (numpy.dtype): Dtype of the result, e.g. np.float32. Default keeps the input dtype.
+    - cache_dir (str): Root cache directory for REST transforms.
+
+    Returns:
+    - raw_ref (mne.io.Raw): The re-referenced Raw EEG data object.
+    """
+    # As in MNE, bad channels are neither part of the reference nor re-referenced
+    eeg = mne.pick_types(raw.info, eeg=True, exclude="bads")
+
+    transform = None
+    if isinstance(ref, str) and ref.upper() == "REST":
+        transform = rest_transform(mne.pick_info(raw.info, eeg), forward=forward, cache_dir=cache_dir)
+    elif isinstance(ref, str) and ref not in SUBTRACTIVE_REFERENCES:
+        ref = [ref]
+    if not isinstance(ref, str):
+        eeg_names = [raw.ch_names[idx] for idx in eeg]
+        missing = [name for name in ref if name not in eeg_names]
+        if missing:
+            raise ValueError(f"Reference channels {missing} are not good EEG channels of the recording.")
+        ref = [eeg_names.index(name) for name in ref]
+
+    raw_ref = output_raw(raw, copy=copy, out=out, dtype=dtype)
+    dtype = raw_ref._data.dtype
+    for chunk in iter_chunks(raw, chunk_seconds=chunk_seconds, dtype=dtype):
+        data = chunk.data
+        if transform is not None:
+            data[eeg] = transform.astype(dtype, copy=False) @ data[eeg]
+        elif len(eeg) == len(data):
+            reference_data(data, ref=ref, out=data)
+        else:
+            data[eeg] = reference_data(data[eeg], ref=ref)
+        raw_ref._data[:, chunk.start:chunk.stop] = data
+
+    with raw_ref.info._unlock():
+        raw_ref.info["custom_ref_applied"] = FIFF.FIFFV_MNE_CUSTOM_REF_ON
+    return raw_ref
 
 # Add your module-specific functions and classes here
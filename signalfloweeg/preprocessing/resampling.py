@@ -1,15 +1,185 @@
 # -*- coding: utf-8 -*-
 """
 Module: resampling
-Description: [Insert module description here]
+Description: Chunked rational polyphase resampling of continuous EEG
 """
 
 # Imports
+from fractions import Fraction
+from functools import lru_cache
+
 import numpy as np
 import mne
+from scipy import signal
+
+from signalfloweeg.io.chunks import iter_chunks
+
+from .filtering import design_fir
+
+# Largest up/down factor considered when approximating a sampling rate ratio
+MAX_RESAMPLE_FACTOR = 1000
+
+
+def resample_factors(sfreq, new_sfreq):
+    """
+    Return the up and down factors that take sfreq to new_sfreq.
+
+    Parameters:
+    - sfreq (float): Current sampling frequency in Hz.
+    - new_sfreq (float): Target sampling frequency in Hz.
+
+    Returns:
+    - up, down (int): Coprime factors with new_sfreq / sfreq == up / down
+      (to within MAX_RESAMPLE_FACTOR for irrational ratios).
+    """
+    ratio = Fraction(new_sfreq / sfreq).limit_denominator(MAX_RESAMPLE_FACTOR)
+    return ratio.numerator, ratio.denominator
+
+
+@lru_cache(maxsize=64)
+def _resample_filter(sfreq, up, down, window, l_freq, h_freq):
+    # Anti-alias low-pass at the upsampled rate, as designed by resample_poly
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = signal.firwin(2 * half_len + 1, 1. / max_rate, window=window)
+
+    # Fuse a band-pass designed at the same (upsampled) rate into one filter
+    if l_freq is not None or h_freq is not None:
+        h = np.convolve(h, design_fir(sfreq * up, l_freq, h_freq))
+    h.setflags(write=False)
+    return h
+
+
+def design_resample_filter(sfreq, new_sfreq, window=("kaiser", 5.0), l_freq=None, h_freq=None):
+    """
+    Design the polyphase filter for a resampling step, reusing earlier designs.
+
+    Parameters:
+    - sfreq (float): Current sampling frequency in Hz.
+    - new_sfreq (float): Target sampling frequency in Hz.
+    - window (str or tuple): Window of the anti-alias filter. Default is ("kaiser", 5.0),
+      as in scipy.signal.resample_poly and MNE.
+    - l_freq, h_freq (float): Optional band-pass edges in Hz, fused with the
+      anti-alias filter so filtering and resampling take a single pass.
+
+    Returns:
+    - h (numpy.ndarray): Read-only, odd-length symmetric filter coefficients at the upsampled rate.
+    """
+    up, down = resample_factors(sfreq, new_sfreq)
+    l_freq = None if l_freq is None else float(l_freq)
+    h_freq = None if h_freq is None else float(h_freq)
+    return _resample_filter(float(sfreq), up, down, window, l_freq, h_freq)
+
+
+def resample_data(data, sfreq, new_sfreq, window=("kaiser", 5.0), l_freq=None, h_freq=None, dtype=None):
+    """
+    Resample channels x samples data with rational polyphase filtering.
+
+    Parameters:
+    - data (numpy.ndarray): Input data array, channels x samples (or 1-D).
+    - sfreq (float): Current sampling frequency in Hz.
+    - new_sfreq (float): Target sampling frequency in Hz.
+    - window, l_freq, h_freq: Passed to design_resample_filter.
+    - dtype (numpy.dtype): Computation and output dtype, e.g. np.float32. Default is float64.
+
+    Returns:
+    - numpy.ndarray: The resampled data.
+    """
+    up, down = resample_factors(sfreq, new_sfreq)
+    dtype = np.dtype(dtype if dtype is not None else np.float64)
+    h = design_resample_filter(sfreq, new_sfreq, window=window, l_freq=l_freq, h_freq=h_freq)
+    return signal.resample_poly(np.asarray(data, dtype=dtype), up, down, axis=-1,
+                                window=h.astype(dtype), padtype="reflect")
+
+
+def resample_events(events, up, down, n_times=None):
+    """
+    Move event samples to a resampled time base.
+
+    Parameters:
+    - events (numpy.ndarray): MNE events array (n_events x 3).
+    - up, down (int): The resampling factors.
+    - n_times (int): Number of samples after resampling, used to clip the
+      last events. Optional.
+
+    Returns:
+    - numpy.ndarray: A copy of the events with rescaled sample indices.
+    """
+    events = np.array(events, copy=True)
+    events[:, 0] = np.round(events[:, 0] * up / down).astype(int)
+    if n_times is not None:
+        events[:, 0] = np.minimum(events[:, 0], n_times - 1)
+    return events
+
+
+def resample_raw(raw, sfreq, chunk_seconds=60, window=("kaiser", 5.0), l_freq=None, h_freq=None,
+                 events=None, dtype=None):
+    """
+    Resample a continuous recording chunk by chunk.
+
+    Chunks start on multiples of the down factor and overlap by the filter
+    half-length, so the result matches resampling the whole recording while
+    holding only the output and one chunk in memory. Annotations keep their
+    times and events are rescaled to the new sampling rate.
+
+    Parameters:
+    - raw (mne.io.Raw): Raw EEG data object. Non-preloaded data is read chunk by chunk.
+    - sfreq (float): Target sampling frequency in Hz.
+    - chunk_seconds (float): Length of each chunk in seconds. Default is 60 seconds.
+    - window (str or tuple): Window of the anti-alias filter. Default is ("kaiser", 5.0).
+    - l_freq, h_freq (float): Optional band-pass edges in Hz, applied in the same pass
+      as the anti-alias filter.
+    - events (numpy.ndarray): Optional events to move to the new sampling rate.
+    - dtype (numpy.dtype): Dtype of the result, e.g. np.float32. Default is float64.
+
+    Returns:
+    - raw_resampled (mne.io.Raw): The resampled Raw EEG data object.
+    - events (numpy.ndarray): The rescaled events, only returned if events were given.
+    """
+    old_sfreq = raw.info['sfreq']
+    up, down = resample_factors(old_sfreq, sfreq)
+    dtype = np.dtype(dtype if dtype is not None else np.float64)
+    h = design_resample_filter(old_sfreq, sfreq, window=window, l_freq=l_freq, h_freq=h_freq)
+
+    # Input samples each output sample depends on, rounded up to whole down-steps
+    n_context = -(-((len(h) - 1) // 2) // up) + 1
+    overlap = -(-n_context // down) * down
+    chunk_samples = max(int(chunk_seconds * old_sfreq) // down, 2 * overlap // down) * down
+
+    n_out = -(-raw.n_times * up // down)
+    data = np.empty((len(raw.ch_names), n_out), dtype=dtype)
+    for chunk in iter_chunks(raw, chunk_seconds=chunk_samples / old_sfreq, overlap_seconds=overlap / old_sfreq,
+                             dtype=dtype):
+        resampled = signal.resample_poly(chunk.data, up, down, axis=-1, window=h.astype(dtype), padtype="reflect")
+        read_start = chunk.start - chunk.core.start
+        out_start = chunk.start * up // down
+        out_stop = min(n_out, -(-chunk.stop * up // down))
+        offset = out_start - read_start * up // down
+        data[:, out_start:out_stop] = resampled[:, offset:offset + out_stop - out_start]
+
+    info = raw.info.copy()
+    with info._unlock():
+        info['sfreq'] = float(sfreq)
+        info['lowpass'] = min(info['lowpass'], sfreq / 2.) if h_freq is None else min(h_freq, sfreq / 2.)
+        if l_freq is not None:
+            info['highpass'] = max(info['highpass'], l_freq)
+
+    first_samp = int(round(raw.first_samp * up / down))
+    if dtype == np.float64:
+        raw_resampled = mne.io.RawArray(data, info, first_samp=first_samp, verbose=False)
+    else:
+        # RawArray casts to float64, so build it on a zero-stride placeholder and swap the buffer in
+        raw_resampled = mne.io.RawArray(np.broadcast_to(np.float64(0), data.shape), info,
+                                        first_samp=first_samp, verbose=False)
+        raw_resampled._data = data
+    annotations = raw.annotations.copy()
+    if annotations.orig_time is None:
+        # Onsets without orig_time are re-based on the first sample when set
+        annotations.onset -= raw_resampled.first_time
+    raw_resampled.set_annotations(annotations)
 
-# Functions and classes
-def dummy_function():
-    pass
+    if events is not None:
+        return raw_resampled, resample_events(events, up, down, n_times=n_out + first_samp)
+    return raw_resampled
 
 # Add your module-specific functions and classes here
@@ -10,13 +10,70 @@ from fooof import FOOOF
 from fooof.sim.gen import gen_aperiodic
 
 # Functions and classes
+def riemann_area(model, aperiodic, freqs, band=None, cumulative=False):
+    """
+    Computes the trapezoid area between model fits and aperiodic fits, per frequency bin.
+
+    Works on stacked fits (e.g. epochs x freqs) in one vectorized pass. Entry i
+    holds the area between freqs[i] and freqs[i + 1]; the last entry is zero,
+    as in riemanArea.
+
+    Args:
+        model (numpy.ndarray): Full model spectra (e.g. FOOOF.fooofed_spectrum_), shape (..., n_freqs).
+        aperiodic (numpy.ndarray): Aperiodic fits on the same frequencies, same shape.
+        freqs (numpy.ndarray): The frequencies in Hz.
+        band (tuple, optional): (low, high) in Hz; only bins fully inside the band
+            contribute, the others are zero.
+        cumulative (bool, optional): Return the running area along frequency
+            instead of per-bin areas. The last entry is then the total area.
+
+    Returns:
+        numpy.ndarray: Areas, shape (..., n_freqs).
+    """
+    freqs = np.asarray(freqs, dtype=float)
+    difference = np.asarray(model) - np.asarray(aperiodic)
+    area = np.zeros(difference.shape)
+    area[..., :-1] = np.diff(freqs) * (difference[..., :-1] + difference[..., 1:]) / 2
+    if band is not None:
+        outside = np.ones(len(freqs), dtype=bool)
+        outside[:-1] = (freqs[:-1] < band[0]) | (freqs[1:] > band[1])
+        area[..., outside] = 0
+    if cumulative:
+        np.cumsum(area, axis=-1, out=area)
+    return area
+
+
+def fooof_area(params, freqs, band=None, cumulative=False):
+    """
+    Computes riemann_area for stored FOOOF parameters, without refitting.
+
+    Args:
+        params (numpy.ndarray): Structured FOOOF parameters from
+            features.neurodynamics.fooof.fit_fooof_group.
+        freqs (numpy.ndarray): The fitted frequencies.
+        band (tuple, optional): Band limits passed to riemann_area.
+        cumulative (bool, optional): Passed to riemann_area.
+
+    Returns:
+        numpy.ndarray: Areas, shape params.shape + (n_freqs,).
+    """
+    from signalfloweeg.features.neurodynamics.fooof import fooof_models
+
+    aperiodic, model = fooof_models(params, freqs)
+    return riemann_area(model, aperiodic, freqs, band=band, cumulative=cumulative)
+
+
 def riemanArea(fm):
-    aperiodic = gen_aperiodic(fm.freqs, fm._robust_ap_fit(fm.freqs, fm.power_spectrum))
-    frequencies = fm.freqs
-    periodic = fm.fooofed_spectrum_
-    riemanArea = np.zeros(len(frequencies))
-    stepSize = frequencies[1] - frequencies[0]
-    for i in range(len(frequencies)-1):
-        riemanArea[i] = stepSize * ((periodic[i] - aperiodic[i]) + (periodic[i+1] - aperiodic[i+1]))/2
-
-    return riemanArea
+    """
+    Computes the area between a fitted FOOOF model and its aperiodic fit, per frequency bin.
+
+    Uses the aperiodic parameters stored on the model.
+
+    Args:
+        fm (fooof.FOOOF): A fitted model.
+
+    Returns:
+        numpy.ndarray: Areas, one per frequency (the last is zero).
+    """
+    aperiodic = gen_aperiodic(fm.freqs, fm.aperiodic_params_)
+    return riemann_area(fm.fooofed_spectrum_, aperiodic, fm.freqs)
@@ -0,0 +1,84 @@
+"""
+Module: cache
+Description: Cache directory and content hashing helpers
+"""
+
+import hashlib
+import os
+
+# Override with the SIGNALFLOWEEG_CACHE environment variable
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "signalfloweeg")
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def get_cache_dir(name=None, cache_dir=None):
+    """
+    Returns (and creates) a cache directory.
+
+    Args:
+        name (str, optional): Subdirectory for a specific cache, e.g. "recordings".
+        cache_dir (str, optional): Root cache directory. Defaults to the
+            SIGNALFLOWEEG_CACHE environment variable or ~/.cache/signalfloweeg.
+
+    Returns:
+        str: The path to the cache directory.
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get("SIGNALFLOWEEG_CACHE", DEFAULT_CACHE_DIR)
+    if name is not None:
+        cache_dir = os.path.join(cache_dir, name)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def file_hash(*file_paths):
+    """
+    Creates a BLAKE2 hash over the contents of one or more files.
+
+    For a single file this matches portal_utils.create_file_hash.
+
+    Args:
+        *file_paths (str): The paths to the files to hash, in order.
+
+    Returns:
+        str: The hexadecimal representation of the hash.
+    """
+    hash_blake2 = hashlib.blake2b()
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                hash_blake2.update(chunk)
+    return hash_blake2.hexdigest()
+
+
+def array_hash(*arrays, **params):
+    """
+    Creates a BLAKE2 hash over numpy arrays and keyword parameters.
+
+    Used to key cached results of processing steps by their input data and
+    settings. Arrays are hashed in blocks, so memory-mapped inputs are not
+    loaded at once.
+
+    Args:
+        *arrays (numpy.ndarray): The arrays to hash, in order. Shape and dtype
+            are part of the hash.
+        **params: JSON-serializable settings that also determine the result.
+
+    Returns:
+        str: The hexadecimal representation of the hash.
+    """
+    import json
+    import numpy as np
+
+    hash_blake2 = hashlib.blake2b()
+    for array in arrays:
+        array = np.asarray(array)
+        hash_blake2.update(f"{array.dtype.str}{array.shape}".encode())
+        # Contiguous blocks along the first axis, in C order
+        rows = array.reshape(1, -1) if array.ndim < 2 or array.flags.c_contiguous else array
+        step = max(1, HASH_CHUNK_SIZE // max(1, rows[0].nbytes))
+        for start in range(0, len(rows), step):
+            hash_blake2.update(np.ascontiguousarray(rows[start:start + step]).data)
+    hash_blake2.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return hash_blake2.hexdigest()
@@ -0,0 +1,128 @@
+"""
+Module: resources
+Description: Helpers for sizing worker pools and tracking memory use
+"""
+
+import os
+import tracemalloc
+from contextlib import contextmanager
+
+
+def available_cpus():
+    """
+    Returns the number of CPU cores this process is allowed to run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def available_memory():
+    """
+    Returns the memory available for new allocations in bytes, or None if unknown.
+    """
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def suggest_n_jobs(n_jobs=None, bytes_per_job=None):
+    """
+    Resolve the number of parallel workers to use.
+
+    Args:
+        n_jobs (int, optional): Requested number of workers. None or -1 uses all
+            available cores; other negative values follow the joblib convention
+            (-2 means all cores but one).
+        bytes_per_job (int, optional): Estimated peak memory of a single worker.
+            When given, the worker count is capped so all workers fit in the
+            currently available memory.
+
+    Returns:
+        int: The number of workers, at least 1.
+    """
+    n_cpus = available_cpus()
+    if n_jobs is None:
+        n_jobs = n_cpus
+    elif n_jobs < 0:
+        n_jobs = n_cpus + 1 + n_jobs
+
+    if bytes_per_job:
+        memory = available_memory()
+        if memory is not None:
+            n_jobs = min(n_jobs, memory // int(bytes_per_job))
+
+    return max(1, int(n_jobs))
+
+
+def format_bytes(n_bytes):
+    """
+    Formats a byte count for status messages, e.g. "1.5 GB".
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n_bytes) < 1024:
+            return f"{n_bytes:.1f} {unit}"
+        n_bytes /= 1024
+    return f"{n_bytes:.1f} TB"
+
+
+def max_rss():
+    """
+    Returns the peak resident set size of this process in bytes, or None if unknown.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def peak_memory(label=None, report=True):
+    """
+    Measures the peak memory allocated while a block runs.
+
+    Allocations are traced with tracemalloc, which includes numpy arrays. The
+    yielded dict is filled in when the block exits. Tracing slows down every
+    allocation, so nothing is traced unless report is True.
+
+    If tracemalloc was already running, its peak is not reset (that would wipe
+    the caller's own measurement), and 'peak_bytes' is an upper bound: the
+    peak since the caller's last reset, above the level at entry.
+
+    Args:
+        label (str, optional): Name printed with the report.
+        report (bool, optional): Whether to measure and print the peak on exit.
+            Defaults to True. When False, the yielded dict stays empty.
+
+    Yields:
+        dict: 'peak_bytes', the peak traced allocation above the level at entry,
+            and 'max_rss_bytes', the peak resident set size of the process.
+    """
+    stats = {}
+    if not report:
+        yield stats
+        return
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        yield stats
+    finally:
+        stats['peak_bytes'] = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+        if not was_tracing:
+            tracemalloc.stop()
+        stats['max_rss_bytes'] = max_rss()
+        print(f"{label or 'Peak memory'}: peak allocation {format_bytes(stats['peak_bytes'])}")
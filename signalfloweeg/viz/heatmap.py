@@ -3,10 +3,9 @@ import os
 import mne
 import matplotlib.pyplot as plt
 import numpy as np
-from fooof import FOOOF
-from fooof.utils import trim_spectrum
-from fooof.sim.gen import gen_aperiodic
-from signalfloweeg.utils.area import riemanArea
+from signalfloweeg.features.neurodynamics.fooof import fit_fooof_group, fooof_models
+from signalfloweeg.utils.area import riemann_area
+from signalfloweeg.io.batch import load_eeg_many
 
 SAVEDIR = "portal_files/plots"
 plt.switch_backend('Agg')
@@ -19,43 +18,21 @@ def heatmap_power(epochs:mne.Epochs):
     epochs (mne.Epochs): The epoch object containing the segmented data.
     """
     temp_var = epochs.compute_psd()
-    FOOF_List = list()
-    periodic_list = list()
-    area_list = list()
-    for i in range(0, temp_var.data.shape[0]):
-        freqs = temp_var.freqs
-        psds = temp_var._data[i]
-
-        # average across channels of interest
-        avgpow = np.mean(psds, axis=0)
-            
-            
-            
-        # select frequencies to fooof
-        freqs_ext, pow_ext = trim_spectrum(freqs, avgpow, [0.5,50]) 
-        # fooof fit
-        fm = FOOOF(
-            peak_width_limits = [2,5], 
-            max_n_peaks = 5,
-            #min_peak_height = fooof_min_peak_height
-        )
-        fm.fit(freqs_ext, pow_ext)
-        FOOF_List.append(fm)
 
-    epochs = len(FOOF_List)
-    freqs = FOOF_List[0].freqs
-    for k in range(0, len(FOOF_List)):
-        fm = FOOF_List[k]
-        periodic = fm.fooofed_spectrum_
-        riemanAreaVals = riemanArea(fm)
-        periodic_list.append(periodic)
-        area_list.append(riemanAreaVals)
+    # average across channels of interest, for all epochs at once
+    avgpow = np.mean(temp_var.get_data(), axis=1)
 
+    # fooof fit of every epoch between 0.5 and 50 Hz
+    params, freqs = fit_fooof_group(
+        avgpow, temp_var.freqs, freq_range=[0.5, 50],
+        peak_width_limits=[2, 5],
+        max_n_peaks=5,
+    )
+    aperiodic, periodic = fooof_models(params, freqs)
 
-    periodic_array = np.array(periodic_list)
-    periodic_array = periodic_array.T
-    area_array = np.array(area_list)
-    area_array = area_array.T
+    epochs = len(params)
+    periodic_array = periodic.T
+    area_array = riemann_area(periodic, aperiodic, freqs).T
 
     #Plot settings for power heat map
     plt.figure(figsize=(7.5,5))
@@ -86,49 +63,31 @@ def headMapDirectory(filePath: str, epoch_length:float):
     print(file_list)
 
 
-    # temp_var = epochs.compute_psd()
-    FOOF_List = list()
-    periodic_list = list()
-    area_list = list()
-    for file in file_list:
-        EEG = mne.io.read_raw_eeglab(file)
-        EEG = EEG.load_data()
+    # Load recordings in parallel, then fit in sorted file order
+    file_fits = {}
+    for file, EEG in load_eeg_many(file_list, "EEGLAB_RAW_SET"):
+        if EEG is None:
+            continue
         epochs = mne.make_fixed_length_epochs(EEG, duration=epoch_length, preload=False)
         temp_var = epochs.compute_psd()
-        for i in range(0, temp_var.data.shape[0]):
-            freqs = temp_var.freqs
-            psds = temp_var._data[i]
-
-            # average across channels of interest
-            avgpow = np.mean(psds, axis=0)
-                
-                
-                
-            # select frequencies to fooof
-            freqs_ext, pow_ext = trim_spectrum(freqs, avgpow, [8,13]) 
-            # fooof fit
-            fm = FOOOF(
-                peak_width_limits = [2,5], 
-                max_n_peaks = 5,
-                #min_peak_height = fooof_min_peak_height
-            )
-            fm.fit(freqs_ext, pow_ext)
-            FOOF_List.append(fm)
-
-    epochs = len(FOOF_List)
-    freqs = FOOF_List[0].freqs
-    for k in range(0, len(FOOF_List)):
-        fm = FOOF_List[k]
-        periodic = fm.fooofed_spectrum_
-        riemanAreaVals = riemanArea(fm)
-        periodic_list.append(periodic)
-        area_list.append(riemanAreaVals)
-
-
-    periodic_array = np.array(periodic_list)
-    periodic_array = periodic_array.T
-    area_array = np.array(area_list)
-    area_array = area_array.T
+
+        # average across channels of interest, then fooof fit of every epoch between 8 and 13 Hz
+        # in this process, as the loading pool already occupies every core
+        avgpow = np.mean(temp_var.get_data(), axis=1)
+        file_fits[file] = fit_fooof_group(
+            avgpow, temp_var.freqs, freq_range=[8, 13],
+            peak_width_limits=[2, 5],
+            max_n_peaks=5,
+            n_jobs=1,
+        )
+    fits = [file_fits[file] for file in file_list if file in file_fits]
+    params = np.concatenate([file_params for file_params, _ in fits])
+    freqs = fits[0][1]
+    aperiodic, periodic = fooof_models(params, freqs)
+
+    epochs = len(params)
+    periodic_array = periodic.T
+    area_array = riemann_area(periodic, aperiodic, freqs).T
 
     #Plot settings for power heat map
     plt.figure(figsize=(7.5,5))